@@ -1,15 +1,33 @@
 ﻿import pandas as pd
-import requests
 from datetime import datetime
-import time
-import re
 import json
 import os
+import itertools
+from excel_reader import iter_excel_chunks, parse_dates, parse_duration_series
+from submission_engine import SubmissionEngine, create_session, to_bulk_entry, post_bulk_entries, written_entries, chunked
+from import_journal import ImportJournal
+from project_index import CommentMatchEngine, NameResolver, normalize_text
+
+# Local copy of /api/reference-data kept between runs, revalidated with its ETag
+REFERENCE_CACHE_FILE = "reference_data_cache.json"
 
 class TimeEntryImporter:
-    def __init__(self, app_url="http://localhost:5000"):
+    def __init__(self, app_url="http://localhost:5000", max_workers=4, rate_limit=5.0):
+        """
+        Parameters:
+        app_url (str): Base URL of the time tracker app
+        max_workers (int): Number of submissions sent concurrently
+        rate_limit (float): Maximum submissions started per second (0 for unlimited)
+        """
         self.app_url = app_url
+        # One keep-alive session shared by every request, with retry/backoff on 429 and 5xx
+        self.session = create_session(pool_size=max_workers)
+        self.engine = SubmissionEngine(max_workers=max_workers, rate_limit=rate_limit)
+        # Groups already written by earlier runs, so an interrupted import can simply be re-run
+        self.journal = ImportJournal()
         self.project_mappings = {}
+        self.reference_data = {}
+        self.name_resolvers = {}  # (label, canonical names) -> NameResolver, memoizing each distinct input
         self.load_project_mappings()
     
     def load_project_mappings(self):
@@ -39,31 +57,20 @@ class TimeEntryImporter:
     def parse_time(self, time_str):
         """
         Parse time string in format like '7:00' or '0:30' to decimal hours
-        """
-        if pd.isna(time_str):
-            return 0.0
-            
-        # If it's already a float/number, return it
-        if isinstance(time_str, (int, float)):
-            return float(time_str)
-        
-        # If we have a string with a colon (time format)
-        if isinstance(time_str, str) and ':' in time_str:
-            try:
-                hours, minutes = time_str.split(':')
-                return float(hours) + float(minutes) / 60
-            except:
-                return 0.0
         
-        # Try to convert directly to float
-        try:
-            return float(time_str)
-        except:
-            return 0.0
+        Single-value form of parse_duration_series(); missing or unparseable values give 0.0
+        """
+        hours, _ = parse_duration_series(pd.Series([time_str], dtype=object))
+        return 0.0 if pd.isna(hours[0]) else float(hours[0])
     
-    def ask_for_project(self, comment, category):
+    def ask_for_project(self, comment, category, save=True):
         """
         Ask the user to provide a project name for a specific comment/category
+        
+        Parameters:
+        comment (str): Task comment
+        category (str): Task category
+        save (bool): Whether to write the mappings file right away; batch callers save once at the end
         """
         # Create a key for the project mapping
         mapping_key = f"{comment}|{category}"
@@ -79,119 +86,246 @@ class TimeEntryImporter:
         
         # Save mapping for future use
         self.project_mappings[mapping_key] = project
-        self.save_project_mappings()
+        if save:
+            self.save_project_mappings()
         
         return project
     
-    def fetch_available_team_members_and_categories(self):
+    def load_cached_reference_data(self):
+        """Load the reference data saved by a previous run, or None if there is none"""
+        if not os.path.exists(REFERENCE_CACHE_FILE):
+            return None
+        try:
+            with open(REFERENCE_CACHE_FILE, 'r') as f:
+                cached = json.load(f)
+            if cached.get('app_url') != self.app_url:
+                return None
+            return cached
+        except Exception as e:
+            print(f"Error loading cached reference data: {e}")
+            return None
+    
+    def fetch_reference_data(self):
         """
-        Fetch available team members and categories from the app
+        Fetch team members, categories, product families and projects from the app
+        
+        The previous response is cached on disk with its ETag, so unchanged
+        reference data costs a single 304 response.
+        
+        Returns:
+        dict: The reference lists (empty lists if unavailable)
         """
+        cached = self.load_cached_reference_data()
+        headers = {'If-None-Match': cached['etag']} if cached and cached.get('etag') else {}
+        
         try:
-            # Make a GET request to the form page
-            response = requests.get(f"{self.app_url}/form")
+            response = self.session.get(f"{self.app_url}/api/reference-data", headers=headers)
+            
+            if response.status_code == 304 and cached:
+                print("Reference data unchanged, using cached copy")
+                return cached['data']
             
             # Check if request was successful
             if response.status_code != 200:
-                print(f"Failed to fetch form data: Status code {response.status_code}")
-                return [], []
-            
-            # Extract team members and categories using regex
-            html = response.text
-            
-            # Find team members
-            team_members_pattern = r'option value="([^"]+)"'
-            team_members_matches = re.findall(team_members_pattern, html)
-            
-            # Find categories
-            categories_pattern = r'value="([^"]+)">([^<]+)</option>'
-            categories_matches = re.findall(categories_pattern, html)
+                print(f"Failed to fetch reference data: Status code {response.status_code}")
+                return cached['data'] if cached else {}
             
-            # Extract unique values
-            unique_team_members = list(set(team_members_matches))
-            unique_categories = list(set([m[0] for m in categories_matches if m[0]]))
-            
-            return unique_team_members, unique_categories
+            data = response.json()
+            try:
+                with open(REFERENCE_CACHE_FILE, 'w') as f:
+                    json.dump({
+                        'app_url': self.app_url,
+                        'etag': response.headers.get('ETag', ''),
+                        'data': data
+                    }, f)
+            except Exception as e:
+                print(f"Error saving reference data cache: {e}")
+            return data
             
         except Exception as e:
-            print(f"Error fetching form data: {e}")
-            return [], []
+            print(f"Error fetching reference data: {e}")
+            return cached['data'] if cached else {}
     
-    def validate_team_member(self, team_member, available_members):
+    def fetch_available_team_members_and_categories(self):
+        """
+        Fetch available team members and categories from the app
+        """
+        self.reference_data = self.fetch_reference_data()
+        return (
+            [m for m in self.reference_data.get('team_members', []) if m],
+            [c for c in self.reference_data.get('categories', []) if c]
+        )
+    
+    def validate_team_member(self, team_member, available_members, interactive=True):
         """
         Validate and possibly correct team member names
         """
-        if not available_members:
-            return team_member
-            
-        if team_member in available_members:
-            return team_member
-            
-        # Try to find a close match
-        for member in available_members:
-            if team_member.lower() in member.lower() or member.lower() in team_member.lower():
-                return member
-                
-        # Ask user to select a team member
-        print(f"\nTeam member '{team_member}' not found in the system.")
-        print("Available team members:")
-        for i, member in enumerate(available_members):
-            print(f"{i+1}. {member}")
+        return self.resolve_name(team_member, available_members, 'team member', 'team members', interactive)
+    
+    def validate_category(self, category, available_categories, interactive=True):
+        """
+        Validate and possibly correct category names
+        """
+        return self.resolve_name(category, available_categories, 'category', 'categories', interactive)
+    
+    def resolve_name(self, name, available_names, label, plural, interactive=True):
+        """
+        Map a name from the import file onto one of the available names
+        
+        Each distinct name is resolved once through a NameResolver (exact,
+        containment, then similarity match); the user is only asked when
+        nothing is close enough, and the answer is remembered too.
+        
+        Parameters:
+        name (str): The name as written in the import file
+        available_names (list): Names known to the app
+        label (str): What the name is, e.g. 'team member'
+        plural (str): Plural of the label, used in the prompt
+        interactive (bool): Whether to ask the user when no match is found
+        
+        Returns:
+        str: The resolved name, or the original one if unresolved
+        """
+        if not available_names:
+            return name
+        
+        key = (label, tuple(available_names))
+        resolver = self.name_resolvers.get(key)
+        if resolver is None:
+            resolver = self.name_resolvers[key] = NameResolver(available_names)
+        
+        resolved = resolver.resolve(name)
+        if resolved is not None:
+            return resolved
+        if not interactive:
+            return name
+        
+        # Ask user to select a name
+        print(f"\n{label.capitalize()} '{name}' not found in the system.")
+        print(f"Available {plural}:")
+        for i, option in enumerate(available_names):
+            print(f"{i+1}. {option}")
             
-        selection = input(f"Select a team member for '{team_member}' (number or name): ").strip()
+        selection = input(f"Select a {label} for '{name}' (number or name): ").strip()
         
         # Parse the input
-        try:
-            # If it's a number
-            idx = int(selection) - 1
-            if 0 <= idx < len(available_members):
-                return available_members[idx]
-        except:
-            # If it's a name
-            if selection in available_members:
-                return selection
-                
-        # If all else fails, return the original
-        print(f"Using original team member name: {team_member}")
-        return team_member
+        resolved = name
+        if selection.isdigit() and 0 <= int(selection) - 1 < len(available_names):
+            resolved = available_names[int(selection) - 1]
+        elif selection in available_names:
+            resolved = selection
+        else:
+            # If all else fails, keep the original
+            print(f"Using original {label}: {name}")
+        
+        resolver.remember(name, resolved)
+        return resolved
     
-    def validate_category(self, category, available_categories):
+    def process_chunk(self, chunk):
         """
-        Validate and possibly correct category names
+        Turn one chunk of raw export rows into processed time entries
+        
+        Team members, categories and projects are resolved afterwards for the
+        whole file at once, see resolve_mappings().
+        
+        Parameters:
+        chunk (pandas.DataFrame): Raw rows from iter_excel_chunks()
+        
+        Returns:
+        pandas.DataFrame: Processed rows with Date, Team Member, Category, Product Family, Project, Hours and Comment
         """
-        if not available_categories:
-            return category
-            
-        if category in available_categories:
-            return category
-            
-        # Try to find a close match
-        for cat in available_categories:
-            if category.lower() in cat.lower() or cat.lower() in category.lower():
-                return cat
-                
-        # Ask user to select a category
-        print(f"\nCategory '{category}' not found in the system.")
-        print("Available categories:")
-        for i, cat in enumerate(available_categories):
-            print(f"{i+1}. {cat}")
+        # Parse all dates of the chunk at once
+        dates = parse_dates(chunk['Date'])
+        for idx in dates.index[dates.isna()]:
+            print(f"Error converting date in row {idx+1}: {chunk.at[idx, 'Date']}")
+        
+        # Get hours (try both columns)
+        hours = pd.Series(0.0, index=chunk.index)
+        for column in ['Hours', 'Hours (Fractional)']:  # The fractional column wins when both are set
+            if column in chunk.columns:
+                values, unparseable = parse_duration_series(chunk[column])
+                for idx in unparseable:
+                    print(f"Could not parse {column} in row {idx+1}: {chunk.at[idx, column]}")
+                hours = values.where(values.notna(), hours)
+        for idx in hours.index[dates.notna() & (hours <= 0)]:
+            print(f"Invalid hours in row {idx+1}: {hours[idx]}")
+        
+        valid = dates.notna() & (hours > 0)
+        chunk = chunk[valid]
+        
+        def text_column(column):
+            if column not in chunk.columns:
+                return pd.Series('', index=chunk.index)
+            return chunk[column].map(lambda v: '' if pd.isna(v) else str(v))
+        
+        processed = pd.DataFrame({
+            'Date': dates[valid],
+            'Team Member': text_column('Person').str.strip(),
+            'Category': text_column('Category').str.strip(),
+            'Product Family': text_column('Product Family').str.strip(),
+            'Project': '',
+            'Hours': hours[valid],
+            'Comment': text_column('Comment')
+        })
+        
+        return processed
+    
+    def resolve_mappings(self, df, team_members, categories, interactive=True):
+        """
+        Resolve team members, categories and projects for every distinct value in one batch
+        
+        Each distinct name is validated once; without interaction, names that
+        match no known one are kept as they are. Projects come from the saved
+        mappings, then from matching the comment against the known projects;
+        only the (comment, category) pairs left over are asked about, all in one
+        go, and the mappings file is written once at the end.
+        
+        Parameters:
+        df (pandas.DataFrame): Output of process_chunk() for the whole file; updated in place
+        team_members (list): Available team members
+        categories (list): Available categories
+        interactive (bool): Whether to ask about values that cannot be resolved automatically
+        """
+        members = {name: self.validate_team_member(name, team_members, interactive)
+                   for name in df['Team Member'].unique()}
+        df['Team Member'] = df['Team Member'].map(members)
+        
+        resolved_categories = {name: self.validate_category(name, categories, interactive)
+                               for name in df['Category'].unique()}
+        df['Category'] = df['Category'].map(resolved_categories)
+        
+        # Projects: saved mappings first, then the comment itself naming a known project
+        engine = CommentMatchEngine(self.reference_data.get('projects', []))
+        projects = {}
+        unresolved = []
+        mapped = matched = 0
+        for key in df[['Comment', 'Category']].drop_duplicates().itertuples(index=False, name=None):
+            mapping_key = f"{key[0]}|{key[1]}"
+            if mapping_key in self.project_mappings:
+                projects[key] = self.project_mappings[mapping_key]
+                mapped += 1
+                continue
             
-        selection = input(f"Select a category for '{category}' (number or name): ").strip()
+            match = engine.match(normalize_text(key[0]))
+            if match:
+                projects[key] = match[0]
+                matched += 1
+            else:
+                unresolved.append(key)
         
-        # Parse the input
-        try:
-            # If it's a number
-            idx = int(selection) - 1
-            if 0 <= idx < len(available_categories):
-                return available_categories[idx]
-        except:
-            # If it's a name
-            if selection in available_categories:
-                return selection
-                
-        # If all else fails, return the original
-        print(f"Using original category: {category}")
-        return category
+        print(f"Projects: {mapped} from saved mappings, {matched} matched from comments, "
+              f"{len(unresolved)} unresolved")
+        
+        if interactive and unresolved:
+            print(f"\nPlease enter a project for the {len(unresolved)} remaining tasks.")
+            try:
+                for key in unresolved:
+                    projects[key] = self.ask_for_project(key[0], key[1], save=False)
+            finally:
+                # One write for the whole batch, kept even if the session is interrupted
+                self.save_project_mappings()
+        
+        df['Project'] = [projects.get(key, '') for key in zip(df['Comment'], df['Category'])]
     
     def process_excel_file(self, excel_file_path, interactive=True):
         """
@@ -201,20 +335,15 @@ class TimeEntryImporter:
         excel_file_path (str): Path to the Excel file
         interactive (bool): Whether to interactively ask for missing information
         """
-        # Load the Excel file
+        # Stream the file in chunks holding only the columns we use
         print(f"Loading Excel file: {excel_file_path}")
         try:
-            # Try with the engine parameter explicitly set to handle older .xls files
-            if excel_file_path.lower().endswith('.xls'):
-                print("Detected .xls file, using xlrd engine...")
-                df = pd.read_excel(excel_file_path, engine='xlrd')
-            else:
-                df = pd.read_excel(excel_file_path)
+            chunks = iter_excel_chunks(excel_file_path)
+            first_chunk = next(chunks)
             
             # Show the first few rows to confirm loading
             print("\nFirst few rows of the Excel file:")
-            print(df.head(2).to_string())
-            print(f"Total rows: {len(df)}\n")
+            print(first_chunk.head(2).to_string())
             
         except Exception as e:
             print(f"Error reading Excel file: {e}")
@@ -237,73 +366,38 @@ class TimeEntryImporter:
         time_columns = ['Hours', 'Hours (Fractional)']
         
         # Verify required columns exist
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in required_columns if col not in first_chunk.columns]
         if missing_columns:
             print(f"Missing required columns: {', '.join(missing_columns)}")
             return False
         
         # Verify at least one time column exists
-        if not any(col in df.columns for col in time_columns):
+        if not any(col in first_chunk.columns for col in time_columns):
             print(f"Missing time columns. Need at least one of: {', '.join(time_columns)}")
             return False
         
-        # Process each row
-        processed_rows = []
+        # Process the file chunk by chunk
+        processed_chunks = []
+        total_rows = 0
         
-        for idx, row in df.iterrows():
-            # Get date
-            try:
-                date = pd.to_datetime(row['Date']).strftime('%Y-%m-%d')
-            except:
-                print(f"Error converting date in row {idx+1}: {row['Date']}")
-                continue
-            
-            # Get team member and validate
-            team_member = str(row['Person']).strip()
-            if interactive:
-                team_member = self.validate_team_member(team_member, team_members)
-            
-            # Get category and validate
-            category = str(row['Category']).strip()
-            if interactive:
-                category = self.validate_category(category, categories)
-            
-            # Get hours (try both columns)
-            hours = 0.0
-            if 'Hours (Fractional)' in df.columns and not pd.isna(row['Hours (Fractional)']):
-                hours = self.parse_time(row['Hours (Fractional)'])
-            elif 'Hours' in df.columns and not pd.isna(row['Hours']):
-                hours = self.parse_time(row['Hours'])
-            
-            if hours <= 0:
-                print(f"Invalid hours in row {idx+1}: {hours}")
-                continue
-            
-            # Get comment
-            comment = str(row['Comment']) if not pd.isna(row['Comment']) else ''
-            
-            # Get project (interactive)
-            project = ""
-            if interactive:
-                project = self.ask_for_project(comment, category)
-            
-            # Add processed row
-            processed_rows.append({
-                'Date': date,
-                'Team Member': team_member,
-                'Category': category,
-                'Project': project,
-                'Hours': hours,
-                'Comment': comment
-            })
+        for chunk in itertools.chain([first_chunk], chunks):
+            total_rows += len(chunk)
+            processed_chunks.append(self.process_chunk(chunk))
+        
+        print(f"Total rows: {total_rows}\n")
+        df_processed = pd.concat(processed_chunks, ignore_index=True)
+        if df_processed.empty:
+            print("No valid time entries found.")
+            return False
+        
+        # Resolve names and projects up front, so the submission runs without interaction
+        self.resolve_mappings(df_processed, team_members, categories, interactive)
         
         # Group entries by date and team member
-        df_processed = pd.DataFrame(processed_rows)
         grouped = df_processed.groupby(['Date', 'Team Member'])
         
-        # Process each group
-        total_submitted = 0
-        
+        # Prepare one submission per group
+        submissions = []
         for (date, team_member), group in grouped:
             # Calculate total hours
             total_hours = round(group['Hours'].sum(), 1)
@@ -313,26 +407,36 @@ class TimeEntryImporter:
             for _, task_row in group.iterrows():
                 task = {
                     'category': task_row['Category'],
+                    'product_family': task_row['Product Family'],
                     'project': task_row['Project'],
                     'hours': task_row['Hours'],
                     'comment': task_row['Comment']
                 }
                 tasks.append(task)
             
-            # Submit entry
-            print(f"Submitting entry for {team_member} on {date} ({total_hours} hours, {len(tasks)} tasks)")
-            success = self.submit_time_entry(date, team_member, total_hours, tasks)
-            
-            if success:
-                total_submitted += 1
-                print(f"✓ Successfully submitted")
-            else:
-                print(f"✗ Failed to submit")
-            
-            # Add delay
-            time.sleep(0.5)
+            submissions.append(to_bulk_entry(date, team_member, total_hours, tasks))
+        
+        # Skip the groups a previous (possibly interrupted) run already submitted
+        submissions, skipped = self.journal.pending(submissions)
+        if skipped:
+            print(f"Skipping {skipped} time entry groups already submitted by an earlier run")
+        if not submissions:
+            print("\nNothing left to submit.")
+            return True
+        
+        # Send the groups in bulk batches, concurrently and rate limited
+        batches = chunked(submissions)
+        print(f"Submitting {len(submissions)} time entry groups in {len(batches)} bulk requests "
+              f"with {self.engine.max_workers} workers...")
+        succeeded, failed = self.engine.run(
+            batches,
+            self.submit_time_entries,
+            describe=lambda batch: f"batch of {len(batch)} groups starting {batch[0]['team_member']} on {batch[0]['date']}",
+            count=lambda batch: sum(len(entry['tasks']) for entry in batch)
+        )
         
-        print(f"\nComplete! Successfully submitted {total_submitted} time entry groups.")
+        submitted = sum(len(batch) for batch in succeeded)
+        print(f"\nComplete! Successfully submitted {submitted} time entry groups.")
         return True
     
     def submit_time_entry(self, date, team_member, total_hours, tasks):
@@ -348,31 +452,30 @@ class TimeEntryImporter:
         Returns:
         bool: True if successful, False otherwise
         """
-        # URL for the form submission
-        url = f"{self.app_url}/form"
-        
-        # Prepare form data
-        form_data = {
-            'entry_date': date,
-            'team_member': team_member,
-            'hours': str(total_hours),
-            'time_balance': 'on'
-        }
-        
-        # Add tasks
-        for i, task in enumerate(tasks):
-            form_data[f'tasks[{i}][category]'] = task['category']
-            form_data[f'tasks[{i}][project]'] = task['project']
-            form_data[f'tasks[{i}][hours]'] = str(task['hours'])
-            form_data[f'tasks[{i}][comment]'] = task['comment']
+        return self.submit_time_entries([to_bulk_entry(date, team_member, total_hours, tasks)])
+    
+    def submit_time_entries(self, entries):
+        """
+        Submit many time entries to the application's bulk endpoint in one request
         
+        Parameters:
+        entries (list): Entries built with to_bulk_entry()
+        
+        Returns:
+        bool: True if every entry was written, False otherwise
+        """
         try:
-            # Send POST request
-            response = requests.post(url, data=form_data)
-            return response.status_code == 200 or response.status_code == 302
+            success, errors, written = post_bulk_entries(self.session, self.app_url, entries)
         except Exception as e:
-            print(f"Error submitting entry: {e}")
+            print(f"Error submitting entries: {e}")
             return False
+        
+        self.journal.mark_committed(written_entries(entries, written))
+        for error in errors:
+            entry = entries[error['entry']] if isinstance(error.get('entry'), int) else None
+            label = f"{entry['team_member']} on {entry['date']}: " if entry else ""
+            print(f"  Rejected {label}{error['message']}")
+        return success
 
 if __name__ == "__main__":
     # Get app URL
@@ -380,8 +483,15 @@ if __name__ == "__main__":
     if not app_url:
         app_url = "http://localhost:5000"
     
+    # Concurrency settings
+    workers_input = input("Number of concurrent submissions (default: 4): ").strip()
+    max_workers = int(workers_input) if workers_input.isdigit() and int(workers_input) > 0 else 4
+    
+    rate_input = input("Maximum submissions per second (default: 5, 0 for unlimited): ").strip()
+    rate_limit = float(rate_input) if rate_input.replace('.', '', 1).isdigit() else 5.0
+    
     # Create importer
-    importer = TimeEntryImporter(app_url)
+    importer = TimeEntryImporter(app_url, max_workers=max_workers, rate_limit=rate_limit)
     
     # Get Excel file path and handle quoted paths
     excel_file_path = input("Enter the path to your Excel file: ").strip()
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+# Keys of the daily aggregate table
+CUBE_DIMENSIONS = ['Date', 'Team Member', 'Category', 'Product Family', 'Project']
+
+# Dimensions /api/time-data can be filtered by, besides the date range
+FILTER_DIMENSIONS = CUBE_DIMENSIONS[1:]
+
+def date_range_slice(dates, start_date=None, end_date=None):
+    """
+    Locate the rows inside a date range in a date-sorted array with binary search
+
+    Parameters:
+    dates (numpy.ndarray): datetime64 values sorted ascending, undated (NaT) values last
+    start_date (datetime, optional): First day to include
+    end_date (datetime, optional): Last day to include
+
+    Returns:
+    tuple: (first, stop) positions; rows[first:stop] are the rows in the range
+    """
+    first = 0
+    if start_date is not None:
+        first = int(np.searchsorted(dates, pd.Timestamp(start_date).to_datetime64(), side='left'))
+
+    if end_date is not None:
+        stop = int(np.searchsorted(dates, pd.Timestamp(end_date).to_datetime64(), side='right'))
+    elif start_date is not None:
+        # Undated rows never fall inside a bounded range
+        stop = int(np.searchsorted(dates, np.datetime64('NaT'), side='left'))
+    else:
+        stop = len(dates)
+    return first, max(first, stop)
+
+class DailyAggregateCube:
+    """
+    Materialized hours and entry counts per (date, team member, category, product family, project)
+
+    Rows are folded in as they arrive, so a date-range query only has to sum the
+    pre-aggregated day buckets instead of scanning every LOG entry. The table is
+    kept sorted by day, so a date range is a contiguous slice found by binary
+    search, and the filter dimensions are dictionary-encoded, so filtering by
+    team member or project compares small integer codes instead of strings.
+
+    New rows only re-aggregate the buckets from their earliest day onwards;
+    the older part of the table and its codes are reused as they are.
+    """
+
+    def __init__(self):
+        table = self._empty_table()
+        encoded = {column: (np.empty(0, dtype=np.int64), {}) for column in FILTER_DIMENSIONS}
+        self._state = (table, encoded)
+
+    @property
+    def table(self):
+        return self._state[0]
+
+    def _splice(self, table, encoded, first, tail):
+        """Replace the table from position first on with tail, extending the dimension codes to match"""
+        # Undated buckets go last, outside every bounded date range
+        tail = tail.sort_values('Date', kind='stable', na_position='last', ignore_index=True)
+        new_table = pd.concat([table.iloc[:first], tail], ignore_index=True) if first else tail
+
+        new_encoded = {}
+        for column in FILTER_DIMENSIONS:
+            codes, lookup = encoded[column]
+            lookup = dict(lookup)  # Copied, so queries on the previous state keep a consistent view
+            for value in pd.unique(tail[column]):
+                if not pd.isna(value) and value not in lookup:
+                    lookup[value] = len(lookup)
+            tail_codes = tail[column].map(lookup).fillna(-1).to_numpy(dtype=np.int64)
+            new_encoded[column] = (np.concatenate([codes[:first], tail_codes]), lookup)
+
+        # Swapped in with one assignment, so a concurrent query never pairs a table with another table's codes
+        self._state = (new_table, new_encoded)
+
+    def _empty_table(self):
+        columns = CUBE_DIMENSIONS + ['Hours', 'Entries']
+        table = pd.DataFrame({column: [] for column in columns})
+        table['Date'] = pd.to_datetime(table['Date'])
+        table['Hours'] = table['Hours'].astype(float)
+        table['Entries'] = table['Entries'].astype(int)
+        return table
+
+    def add(self, df):
+        """
+        Fold new LOG rows into the cube
+
+        Parameters:
+        df (pandas.DataFrame): Typed LOG rows (Date as datetime64, Hours as float)
+        """
+        if df.empty:
+            return
+
+        rows = df[CUBE_DIMENSIONS + ['Hours']].copy()
+        rows['Date'] = rows['Date'].dt.normalize()  # One bucket per day
+        new_buckets = self._aggregate(rows.assign(Entries=1))
+
+        table, encoded = self._state
+        if table.empty:
+            self._splice(table, encoded, 0, new_buckets)
+            return
+
+        # Only buckets on or after the earliest new day can change, plus the undated ones at the end
+        dates = table['Date'].to_numpy()
+        first = int(np.searchsorted(dates, np.datetime64('NaT'), side='left'))
+        new_dates = new_buckets['Date'].dropna()
+        if not new_dates.empty:
+            first = min(first, int(np.searchsorted(dates[:first], new_dates.min().to_datetime64(), side='left')))
+        tail = self._aggregate(pd.concat([table.iloc[first:], new_buckets], ignore_index=True))
+        self._splice(table, encoded, first, tail)
+
+    def query(self, start_date=None, end_date=None, filters=None):
+        """
+        Return the day buckets inside a date range, optionally restricted to some dimension values
+
+        Parameters:
+        start_date (datetime, optional): First day to include
+        end_date (datetime, optional): Last day to include
+        filters (dict, optional): FILTER_DIMENSIONS column -> list of accepted values
+
+        Returns:
+        pandas.DataFrame: Matching rows of the cube, sorted by day
+        """
+        table, encoded = self._state
+        first, stop = date_range_slice(table['Date'].to_numpy(), start_date, end_date)
+        table = table.iloc[first:stop]
+        if not filters:
+            return table
+
+        mask = np.ones(len(table), dtype=bool)
+        for column, values in filters.items():
+            codes, lookup = encoded[column]
+            wanted = [lookup[value] for value in values if value in lookup]
+            mask &= np.isin(codes[first:stop], wanted)
+        return table[mask]
+
+    def _aggregate(self, rows):
+        # dropna=False keeps undated entries so totals match the raw LOG
+        return rows.groupby(CUBE_DIMENSIONS, dropna=False, sort=False, as_index=False).agg(
+            Hours=('Hours', 'sum'),
+            Entries=('Entries', 'sum')
+        )
+
+def summarize(buckets):
+    """
+    Build the totals and breakdowns served by /api/time-data from cube rows
+
+    Parameters:
+    buckets (pandas.DataFrame): Rows returned by DailyAggregateCube.query()
+
+    Returns:
+    dict: Summary, per-dimension totals, timeline and team member pivots
+    """
+    # Create breakdowns of hours by team member and category / project
+    team_category = buckets.pivot_table(
+        values='Hours',
+        index='Team Member',
+        columns='Category',
+        aggfunc='sum',
+        fill_value=0
+    )
+    team_project = buckets.pivot_table(
+        values='Hours',
+        index='Team Member',
+        columns='Project',
+        aggfunc='sum',
+        fill_value=0
+    )
+
+    return {
+        'summary': {
+            'total_hours': float(buckets['Hours'].sum()),
+            'total_entries': int(buckets['Entries'].sum()),
+            'team_members': buckets['Team Member'].nunique(),
+            'categories': buckets['Category'].nunique(),
+            'projects': buckets['Project'].nunique(),
+            'date_range': {
+                'start': buckets['Date'].min().strftime('%Y-%m-%d'),
+                'end': buckets['Date'].max().strftime('%Y-%m-%d')
+            }
+        },
+        'by_category': buckets.groupby('Category')['Hours'].sum().to_dict(),
+        'by_team_member': buckets.groupby('Team Member')['Hours'].sum().to_dict(),
+        'by_project': buckets.groupby('Project')['Hours'].sum().to_dict(),
+        'by_date': buckets.groupby(buckets['Date'].dt.strftime('%Y-%m-%d'))['Hours'].sum().to_dict(),
+        'by_team_member_category': team_category.to_dict('index'),
+        'by_team_member_project': team_project.to_dict('index')
+    }
@@ -1,82 +1,181 @@
 from flask import Flask, render_template, request, redirect, url_for, jsonify
-import gspread
 import os
 import pandas as pd
 from datetime import datetime
-from gspread.exceptions import WorksheetNotFound
-import re
-from difflib import get_close_matches
+import hashlib
+import threading
+import time
+from config import GOOGLE_SHEET_KEY, SERVICE_ACCOUNT_FILE, SHEETS_MIRROR
+from storage import SheetsStorage, create_storage
+from aggregates import summarize
+from response_cache import ResponseCache
+from write_queue import WriteQueue
+import metrics
+from project_index import ProjectIndex, normalize_text  # normalize_text stays importable from app
 
 app = Flask(__name__)
+metrics.instrument_app(app)
+
+# Seconds the reference lists are served from memory before the sheet is read again
+REFERENCE_DATA_TTL = float(os.environ.get('REFERENCE_DATA_TTL', '300'))
+
+_reference_cache = {'data': None, 'loaded_at': 0.0}
+_reference_lock = threading.Lock()
+
+# Fuzzy-matching index over the project list, kept in sync with the reference data
+_project_index = ProjectIndex()
+
+# Local copy of LOG so analytics only download rows added since the last request
+LOG_SNAPSHOT_PATH = os.environ.get('LOG_SNAPSHOT_PATH', os.path.join(app.root_path, 'data', 'log_snapshot.pkl'))
+
+# Storage engine serving reads and writes, selected with STORAGE_BACKEND ('sheets' or 'sqlite')
+_storage = create_storage(GOOGLE_SHEET_KEY, SERVICE_ACCOUNT_FILE, snapshot_path=LOG_SNAPSHOT_PATH)
+
+# The Google Sheet itself: the storage engine, or the mirror of the SQLite engine
+_sheets = _storage if isinstance(_storage, SheetsStorage) else SheetsStorage(GOOGLE_SHEET_KEY, SERVICE_ACCOUNT_FILE)
+
+# What to do with rows identical to one already in LOG (same date, team member, category,
+# project, hours and comment): 'skip' leaves them out, 'flag' writes them but reports them
+DUPLICATE_ENTRIES = os.environ.get('DUPLICATE_ENTRIES', 'skip')
+
+# Query parameters of /api/time-data that filter by a dimension, and the LOG column each one filters
+TIME_DATA_FILTERS = {
+    'team_member': 'Team Member',
+    'category': 'Category',
+    'product_family': 'Product Family',
+    'project': 'Project'
+}
+
+# Rendered /api/time-data responses keyed by (start_date, end_date, filters, data version)
+TIME_DATA_CACHE_SIZE = int(os.environ.get('TIME_DATA_CACHE_SIZE', '64'))
+_time_data_cache = ResponseCache(TIME_DATA_CACHE_SIZE)
+_time_data_lock = threading.Lock()
+
+# Acknowledge submissions once they are queued on local disk and write them to the sheet in
+# the background; WRITE_BEHIND=0 writes to the sheet during the request instead
+WRITE_BEHIND = os.environ.get('WRITE_BEHIND', '1') != '0'
+WRITE_QUEUE_PATH = os.environ.get('WRITE_QUEUE_PATH', os.path.join(app.root_path, 'data', 'write_queue.sqlite3'))
+_write_queue = WriteQueue(WRITE_QUEUE_PATH, lambda items: flush_queued_writes(items))
+
+# Write anything a previous run left in the queue, however the app is served (flask run, WSGI, app.run)
+_write_queue.start()
 
 def get_gsheet_connection():
-    """Helper function to connect to Google Sheets"""
-    # Path to the service account key
-    key_file_path = os.path.join(app.root_path, 'keys', 'dt-resource-tracker-db3f71699674.json')
+    """Helper function to get the shared, long-lived Google Sheets connection"""
+    return _sheets.connect()
+
+def reset_gsheet_connection():
+    """Forget the cached connection so the next request reconnects"""
+    _sheets.reset()
+
+def refresh_log_snapshot():
+    """Bring the storage's view of LOG up to date (tops up the local snapshot of the sheet)"""
+    with metrics.span('refresh_log'):
+        _storage.refresh()
+
+_log_refresh_lock = threading.Lock()
+
+def refresh_log_snapshot_in_background():
+    """Start refresh_log_snapshot() on a background thread, unless one is already running"""
+    if not _log_refresh_lock.acquire(blocking=False):
+        return
     
-    try:
-        # Connect to Google Sheets using the relative path
-        gc = gspread.service_account(filename=key_file_path)
-        
-        # Use the actual key from your Google Sheet's URL
-        sh = gc.open_by_key('1gmK-3cT9hdRfXdG8FV4YMti6mgKVIBLarufkLQDvzeA')
-        
-        return sh
-    except Exception as e:
-        print(f"Error connecting to Google Sheet: {e}")
-        return None
+    def run():
+        try:
+            refresh_log_snapshot()
+        finally:
+            _log_refresh_lock.release()
+    threading.Thread(target=run, name='log-snapshot-refresh', daemon=True).start()
+
+def load_reference_data():
+    """
+    Read the team member, category, product family and project lists from storage
+    
+    Returns:
+    dict: Sorted, de-duplicated reference lists keyed by name
+    """
+    team_members, categories, product_families, projects = _storage.reference_columns()
+    
+    return {
+        'team_members': sorted(team_members),
+        'categories': sorted(set(categories)),
+        'product_families': sorted({pf for pf in product_families if pf.strip()}),
+        'projects': sorted({proj for proj in projects if proj.strip()})
+    }
 
-def get_log_data():
-    """Retrieve and process data from the LOG sheet"""
-    sh = get_gsheet_connection()
-    if not sh:
-        return pd.DataFrame()
+def get_reference_data(force_refresh=False):
+    """
+    Return the cached reference lists, reloading them from the sheet once the TTL has expired
     
-    try:
-        # Get the LOG worksheet
-        log_worksheet = sh.worksheet('LOG')
+    Parameters:
+    force_refresh (bool): Ignore the cache and read the sheet again
+    
+    Returns:
+    dict or None: The reference lists, or None if the sheet could not be read
+    """
+    with _reference_lock:
+        cached = _reference_cache['data']
+        age = time.monotonic() - _reference_cache['loaded_at']
+        if cached is not None and not force_refresh and age < REFERENCE_DATA_TTL:
+            return cached
         
-        # Get all values including headers
-        data = log_worksheet.get_all_values()
+        try:
+            with metrics.span('load_reference_data'):
+                data = load_reference_data()
+        except Exception as e:
+            print(f"Error loading reference data: {e}")
+            reset_gsheet_connection()
+            return None
         
-        if not data:
-            return pd.DataFrame()
-            
-        # Convert to DataFrame
-        headers = data[0]
-        records = data[1:]
-        df = pd.DataFrame(records, columns=headers)
+        data['version'] = reference_version(data)
         
-        # Convert date strings to datetime objects
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+        # Update the index in place rather than rebuilding it from scratch
+        _project_index.sync(data['projects'])
+        data['project_index'] = _project_index
         
-        # Convert hours to numeric
-        df['Hours'] = pd.to_numeric(df['Hours'], errors='coerce')
+        _reference_cache['data'] = data
+        _reference_cache['loaded_at'] = time.monotonic()
+        print(f"Loaded reference data: {len(data['team_members'])} team members, "
+              f"{len(data['categories'])} categories, {len(data['projects'])} projects")
+        return data
+
+def reference_version(data):
+    """Content hash of the reference lists, used as the ETag of /api/reference-data"""
+    lists = [data['team_members'], data['categories'], data['product_families'], data['projects']]
+    return hashlib.sha1(repr(lists).encode('utf-8')).hexdigest()
+
+def add_cached_projects(new_projects):
+    """
+    Add projects to the cached reference lists in place, before they reach the sheet
+    
+    Parameters:
+    new_projects (list): Project names queued for the BACKEND worksheet
+    """
+    with _reference_lock:
+        cached = _reference_cache['data']
+        if cached is None:
+            return
         
-        return df
-    except Exception as e:
-        print(f"Error retrieving log data: {e}")
-        return pd.DataFrame()
-
-def normalize_text(text):
-    """Normalize text for better fuzzy matching"""
-    if not text:
-        return ""
-    # Convert to lowercase
-    text = text.lower()
-    # Remove special characters and extra spaces
-    text = re.sub(r'[^\w\s]', '', text)
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+        # Swap in an updated copy so requests holding the old dict see consistent lists
+        data = dict(cached, projects=sorted(set(cached['projects']).union(new_projects)))
+        data['version'] = reference_version(data)
+        for project in new_projects:
+            _project_index.add(project)
+        _reference_cache['data'] = data
+
+def invalidate_reference_data():
+    """Drop the cached reference lists so the next request reads them from the sheet"""
+    with _reference_lock:
+        _reference_cache['data'] = None
+        _reference_cache['loaded_at'] = 0.0
 
 def find_close_match(input_project, existing_projects, threshold=0.7):
     """
-    Find a close match for the input project in the existing projects list using fuzzy matching
+    Find a close match for the input project in the existing projects using fuzzy matching
     
     Parameters:
     input_project (str): The project name entered by the user
-    existing_projects (list): List of existing project names
+    existing_projects (ProjectIndex or list): Index (or plain list) of existing project names
     threshold (float): The similarity threshold for considering a match (0.0 to 1.0)
     
     Returns:
@@ -84,31 +183,14 @@ def find_close_match(input_project, existing_projects, threshold=0.7):
     """
     if not input_project:
         return None
-        
-    # Normalize input
-    normalized_input = normalize_text(input_project)
-    if not normalized_input:
-        return None
-    
-    # Normalize existing projects
-    normalized_projects = [normalize_text(p) for p in existing_projects if p]
-    
-    # Create a mapping from normalized names back to original names
-    original_mapping = {normalize_text(p): p for p in existing_projects if p}
     
-    # Try to find a direct match first (case-insensitive)
-    for norm_proj, orig_proj in original_mapping.items():
-        if norm_proj == normalized_input:
-            return orig_proj
+    # Plain lists are indexed on the fly; the form passes the prebuilt index
+    if not isinstance(existing_projects, ProjectIndex):
+        existing_projects = ProjectIndex(existing_projects)
     
-    # Try fuzzy matching
-    matches = get_close_matches(normalized_input, normalized_projects, n=1, cutoff=threshold)
-    
-    if matches:
-        # Return the original project name
-        return original_mapping[matches[0]]
-    
-    return None
+    # Exact (normalized) match first, then fuzzy matching over the trigram candidates
+    with metrics.span('find_close_match'):
+        return existing_projects.find_close(input_project, threshold)
 
 def add_project_to_backend(new_project, worksheet=None):
     """
@@ -123,40 +205,197 @@ def add_project_to_backend(new_project, worksheet=None):
     """
     if not new_project or new_project.strip() == "":
         return False
-        
-    # If no worksheet is provided, get a connection
-    if worksheet is None:
-        sh = get_gsheet_connection()
-        if not sh:
-            return False
-        
-        try:
-            worksheet = sh.worksheet("BACKEND DATA FOR APP.PY")
-        except Exception as e:
-            print(f"Error accessing worksheet: {e}")
-            return False
+    
+    return add_projects_to_backend([new_project], worksheet)
+
+def add_projects_to_backend(new_projects, worksheet=None):
+    """
+    Add several new projects to the backend data with one read and one write
+    
+    Parameters:
+    new_projects (list): The new project names to add
+    worksheet (gspread.Worksheet, optional): The worksheet object (Sheets storage only)
+    
+    Returns:
+    bool: True if successful, False otherwise
+    """
+    if not _storage.add_projects(new_projects, worksheet):
+        return False
+    
+    # The cached project list is now stale
+    if any(p and p.strip() for p in new_projects):
+        invalidate_reference_data()
+    return True
+
+def resolve_project(project_input, project_index, pending_projects):
+    """
+    Map a typed project name onto an existing project using fuzzy matching
+    
+    New projects go into the request's own pending index, not the shared one:
+    they only become known to other requests once write_entries() has queued
+    or written them, so a rejected submission cannot leave behind a project
+    that never reaches the BACKEND worksheet.
+    
+    Parameters:
+    project_input (str): The project name entered by the user
+    project_index (ProjectIndex): Index of existing project names
+    pending_projects (ProjectIndex): New projects of the current request
+    
+    Returns:
+    tuple: (project name to record, True if it is a new project)
+    """
+    project_input = (project_input or '').strip()
+    if not project_input:
+        return "", False
+    
+    # Try to find a close match in existing projects
+    matched_project = find_close_match(project_input, project_index)
+    if matched_project:
+        print(f"Matched '{project_input}' to existing project '{matched_project}'")
+        return matched_project, False
+    
+    # Later tasks of the same request should match a project added by an earlier one
+    matched_project = find_close_match(project_input, pending_projects)
+    if matched_project:
+        return matched_project, False
+    
+    pending_projects.add(project_input)
+    return project_input, True
+
+def write_entries(rows, new_projects=()):
+    """
+    Write LOG rows and the new projects they use
+    
+    The SQLite engine writes them right away and, with SHEETS_MIRROR, queues
+    a copy for the sheet. With the Sheets engine and WRITE_BEHIND both are put
+    on the local write queue and the cached reference lists are updated in
+    place; otherwise they are written to the sheet right away.
+    
+    Parameters:
+    rows (list): Row value lists built with build_log_row()
+    new_projects (list): Project names to add to the BACKEND worksheet
+    
+    Returns:
+    bool: True if the writes were queued or made, False if the sheet could not be reached
+    """
+    if _storage is not _sheets:
+        add_projects_to_backend(new_projects)
+        _storage.append_rows(rows)
+        if SHEETS_MIRROR:
+            if new_projects:
+                _write_queue.enqueue('projects', list(new_projects))
+            if rows:
+                _write_queue.enqueue('log_rows', rows)
+        return True
+    
+    if WRITE_BEHIND:
+        if new_projects:
+            _write_queue.enqueue('projects', list(new_projects))
+            add_cached_projects(new_projects)
+        if rows:
+            _write_queue.enqueue('log_rows', rows)
+            # Not in the sheet yet, but a repeated submit must already count as a duplicate
+            _storage.record_queued(rows)
+        return True
+    
+    if not get_gsheet_connection():
+        return False
+    
+    if new_projects:
+        add_projects_to_backend(new_projects)
+    _sheets.append_rows(rows)
+    return True
+
+def flush_queued_writes(items):
+    """
+    Write a batch of queued writes to the sheet, coalesced into one project update and one LOG append
+    
+    The queue always drains to the Google Sheet, whether it is the storage
+    engine (write-behind) or the mirror of the SQLite engine.
+    
+    Parameters:
+    items (list): (kind, payload) tuples from the write queue
+    
+    Returns:
+    bool: True if everything was written; False leaves the batch queued for a retry
+    """
+    projects = [project for kind, payload in items if kind == 'projects' for project in payload]
+    rows = [row for kind, payload in items if kind == 'log_rows' for row in payload]
+    
+    if not get_gsheet_connection():
+        return False
     
     try:
-        # Get all projects from column 4
-        all_projects = worksheet.col_values(4)[1:]  # Skip header
-        
-        # Check if the project already exists (exact match)
-        if new_project in all_projects:
-            print(f"Project already exists: {new_project}")
-            return True  # Already exists, no need to add
-        
-        # Find the first empty cell in column 4 (project column)
-        next_row = len(all_projects) + 2  # +2 because: +1 for header, +1 for 1-indexed
-        
-        # Update the cell with the new project
-        worksheet.update_cell(next_row, 4, new_project)
-        
-        print(f"Added new project: {new_project}")
+        # Projects first; a retry after a failed append skips the ones already added
+        if projects:
+            if not _sheets.add_projects(projects):
+                return False
+            if _storage is _sheets:
+                invalidate_reference_data()
+        _sheets.append_rows(rows)
+        if rows and _storage is _sheets:
+            # Top up here, off the request path, so duplicate checks see the sheet as it is now
+            refresh_log_snapshot()
         return True
     except Exception as e:
-        print(f"Error adding project to backend: {e}")
+        print(f"Error writing queued entries: {e}")
+        reset_gsheet_connection()
         return False
 
+def find_duplicate_rows(rows):
+    """
+    Return True for every row (built with build_log_row()) that is already in LOG
+    
+    With the Sheets engine this checks the in-memory fingerprint indexes of the
+    LOG snapshot and of the rows queued for it, and never reads the sheet, so a
+    submission only waits for local disk. The snapshot is topped up in the
+    background instead (and by analytics requests and the write-queue flusher),
+    which is how rows written by other processes become visible. The SQLite
+    engine looks the rows up through its date index.
+    """
+    if not rows:
+        return []
+    
+    refresh_log_snapshot_in_background()
+    with metrics.span('find_duplicates'):
+        flags = _storage.find_duplicates(rows)
+    for row, is_duplicate in zip(rows, flags):
+        if is_duplicate:
+            print(f"Duplicate LOG entry: {row}")
+    return flags
+
+def split_duplicate_rows(rows):
+    """
+    Separate rows that are already in LOG from new ones
+    
+    Parameters:
+    rows (list): Row value lists built with build_log_row()
+    
+    Returns:
+    tuple: (rows to write, duplicate rows); with DUPLICATE_ENTRIES='flag' every row is written
+    """
+    if not rows:
+        return [], []
+    
+    flags = find_duplicate_rows(rows)
+    duplicates = [row for row, is_duplicate in zip(rows, flags) if is_duplicate]
+    
+    if DUPLICATE_ENTRIES == 'flag':
+        return rows, duplicates
+    return [row for row, is_duplicate in zip(rows, flags) if not is_duplicate], duplicates
+
+def build_log_row(entry_date, team_member, task):
+    """Return the LOG row values for one task, in LOG_HEADERS order"""
+    return [
+        entry_date,
+        team_member,
+        task['category'],
+        task['product_family'],
+        task['project'],
+        task['hours'],
+        task['comment']
+    ]
+
 @app.route('/')
 def portal():
     """Main portal page"""
@@ -165,8 +404,8 @@ def portal():
 @app.route('/form', methods=['GET', 'POST'])
 def form():
     """Time entry form route"""
-    sh = get_gsheet_connection()
-    if not sh:
+    reference = get_reference_data()
+    if reference is None:
         return render_template('form.html', 
                               team_members=[], 
                               categories=[], 
@@ -177,26 +416,12 @@ def form():
                               error="Could not connect to Google Sheets")
     
     try:
-        # Access the worksheet by name
-        worksheet = sh.worksheet("BACKEND DATA FOR APP.PY")
-
-        # Fetch the data from the worksheet
-        # Sort team members alphabetically before passing to the template
-        team_members = sorted(worksheet.col_values(1)[1:])  # Skip header
-        categories = sorted(list(set(worksheet.col_values(2)[1:])))  # Skip header and remove duplicates
-        
-        # Get all product families from column 3 (renamed from subfields)
-        all_product_families = worksheet.col_values(3)[1:]  # Skip header
-        
-        # Get all projects from column 4
-        all_projects = worksheet.col_values(4)[1:]  # Skip header
-        
-        # Filter out empty values and duplicates
-        all_product_families = [pf for pf in all_product_families if pf.strip()]
-        unique_product_families = sorted(list(set(all_product_families)))
-        
-        all_projects = [proj for proj in all_projects if proj.strip()]
-        unique_projects = sorted(list(set(all_projects)))
+        # Reference lists are served from memory; they are already sorted and de-duplicated
+        team_members = reference['team_members']
+        categories = reference['categories']
+        unique_product_families = reference['product_families']
+        unique_projects = reference['projects']
+        project_index = reference['project_index']
 
         # If the request method is POST, handle the form submission
         if request.method == 'POST':
@@ -215,6 +440,8 @@ def form():
             
             # Extract tasks data
             tasks = []
+            new_projects = []
+            pending_projects = ProjectIndex()
             
             # Process tasks data from form_data
             task_indices = set()
@@ -236,23 +463,11 @@ def form():
                     product_family = form_data.get(product_family_key, [''])[0]
                     
                     # Process project field - handle typed input with fuzzy matching
-                    project_input = form_data.get(project_key, [''])[0].strip()
-                    
-                    # If project input is provided
-                    if project_input:
-                        # Try to find a close match in existing projects
-                        matched_project = find_close_match(project_input, unique_projects)
-                        
-                        if matched_project:
-                            # Use the matched existing project
-                            project = matched_project
-                            print(f"Matched '{project_input}' to existing project '{matched_project}'")
-                        else:
-                            # This is a new project, add it to the backend
-                            project = project_input
-                            add_project_to_backend(project, worksheet)
-                    else:
-                        project = ""
+                    project, is_new_project = resolve_project(form_data.get(project_key, [''])[0], project_index,
+                                                                  pending_projects)
+                    if is_new_project:
+                        # This is a new project, add it to the backend along with the entry
+                        new_projects.append(project)
 
                     # Get hours, handling empty or invalid values
                     hours = form_data.get(hours_key, [''])[0]
@@ -300,50 +515,31 @@ def form():
                                   all_projects=unique_projects,
                                   error_message=error_message)
             
-            # Select the 'LOG' sheet or create it if it does not exist
-            try:
-                log_worksheet = sh.worksheet('LOG')
-            except WorksheetNotFound:
-                log_worksheet = sh.add_worksheet(title='LOG', rows="100", cols="20")
-
-            # Check if headers need to be written
-            all_values = log_worksheet.get_all_values()
-            needs_headers = False
-
-            if not all_values:
-                # Sheet is completely empty
-                needs_headers = True
-            else:
-                # Check if the first row contains our expected headers
-                first_row = all_values[0]
-                expected_headers = ['Date', 'Team Member', 'Category', 'Product Family', 'Project', 'Hours', 'Comments']
-    
-                # Check if first row is empty or doesn't match our headers
-                if not first_row or set(expected_headers) != set(first_row):
-                    needs_headers = True
-
-            if needs_headers:
-                # Clear any existing content from the first row
-                if all_values:
-                    log_worksheet.update('A1:G1', [['', '', '', '', '', '', '']])
-    
-                # Add the headers
-                headers = ['Date', 'Team Member', 'Category', 'Product Family', 'Project', 'Hours', 'Comments']
-                log_worksheet.update('A1:G1', [headers])
-                print("Added headers to LOG sheet")
-
-            # Write each task as a separate row
-            for task in tasks:
-                row_data = [
-                    entry_date,
-                    team_member,
-                    task['category'],
-                    task['product_family'],
-                    task['project'],
-                    task['hours'],
-                    task['comment']
-                ]
-                log_worksheet.append_row(row_data)
+            # Leave out tasks that are already in LOG, e.g. from a double-clicked submit
+            rows, duplicates = split_duplicate_rows(
+                [build_log_row(entry_date, team_member, task) for task in tasks])
+            if duplicates and not rows:
+                return render_template('form.html', 
+                                  team_members=team_members, 
+                                  categories=categories, 
+                                  product_families=unique_product_families,
+                                  projects=unique_projects,
+                                  all_product_families=unique_product_families,
+                                  all_projects=unique_projects,
+                                  error_message=f"These tasks were already submitted for {team_member} on {entry_date}.")
+            
+            # Write all tasks as one multi-row append (queued when write-behind is on)
+            with metrics.span('write_entries'):
+                written = write_entries(rows, new_projects)
+            if not written:
+                return render_template('form.html', 
+                                  team_members=team_members, 
+                                  categories=categories, 
+                                  product_families=unique_product_families,
+                                  projects=unique_projects,
+                                  all_product_families=unique_product_families,
+                                  all_projects=unique_projects,
+                                  error_message="Could not connect to Google Sheets")
 
             # Redirect to the same page to show the updated info or clear the form
             return redirect(url_for('form'))
@@ -359,6 +555,7 @@ def form():
 
     except Exception as e:
         print(f"Error processing form data: {e}")
+        reset_gsheet_connection()
         return render_template('form.html', 
                             team_members=[],
                             categories=[],
@@ -367,122 +564,232 @@ def form():
                             all_product_families=[],
                             all_projects=[])
 
-@app.route('/analytics')
-def analytics():
-    """Analytics dashboard route"""
-    return render_template('analytics.html')
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint: request, section and Google Sheets call timings and counts"""
+    return app.response_class(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
-@app.route('/api/time-data')
-def time_data_api():
-    """API endpoint to get time tracking data"""
-    try:
-        df = get_log_data()
+@app.route('/api/reference-data')
+def reference_data_api():
+    """
+    API endpoint returning team members, categories, product families and projects as JSON
+    
+    The response carries an ETag so clients can cache it and revalidate cheaply.
+    """
+    reference = get_reference_data()
+    if reference is None:
+        return jsonify({'success': False, 'message': 'Could not connect to Google Sheets'}), 503
+    
+    response = jsonify({
+        'success': True,
+        'version': reference['version'],
+        'team_members': reference['team_members'],
+        'categories': reference['categories'],
+        'product_families': reference['product_families'],
+        'projects': reference['projects']
+    })
+    response.set_etag(reference['version'])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def build_bulk_rows(entries, reference):
+    """
+    Validate bulk entries against the reference data and turn them into LOG rows
+    
+    Parameters:
+    entries (list): Entry dicts with date, team_member, optional hours and a list of tasks
+    reference (dict): Reference data from get_reference_data()
+    
+    Returns:
+    tuple: (rows to append, entry number of every row, list of error dicts, list of new project names)
+    """
+    known_team_members = set(reference['team_members'])
+    known_categories = set(reference['categories'])
+    known_product_families = set(reference['product_families'])
+    project_index = reference['project_index']
+    pending_projects = ProjectIndex()
+    
+    rows = []
+    row_entries = []
+    errors = []
+    new_projects = []
+    
+    for entry_number, entry in enumerate(entries):
+        def reject(message):
+            errors.append({'entry': entry_number, 'message': message})
         
-        if df.empty:
-            print("Warning: Log data is empty")
-            # For debugging purposes, let's return sample data
-            return jsonify({
-                'success': True,
-                'message': 'Note: Using sample data because the LOG sheet is empty',
-                'summary': {
-                    'total_hours': 40,
-                    'total_entries': 5,
-                    'team_members': 2,
-                    'categories': 3,
-                    'projects': 2,
-                    'date_range': {
-                        'start': '2025-03-10',
-                        'end': '2025-03-17'
-                    }
-                },
-                'by_category': {'Development': 20, 'Testing': 10, 'Meetings': 10},
-                'by_team_member': {'John Doe': 25, 'Jane Smith': 15},
-                'by_project': {'Project A': 30, 'Project B': 10},
-                'by_date': {'2025-03-10': 8, '2025-03-11': 8, '2025-03-12': 8, '2025-03-13': 8, '2025-03-14': 8},
-                'recent_entries': [
-                    {'Date': '2025-03-14', 'Team Member': 'John Doe', 'Category': 'Development', 'Project': 'Project A', 'Hours': '8', 'Comments': 'Working on feature X'},
-                    {'Date': '2025-03-13', 'Team Member': 'Jane Smith', 'Category': 'Testing', 'Project': 'Project A', 'Hours': '5', 'Comments': 'Testing feature X'},
-                    {'Date': '2025-03-13', 'Team Member': 'Jane Smith', 'Category': 'Meetings', 'Project': 'Project B', 'Hours': '3', 'Comments': 'Planning meeting'},
-                    {'Date': '2025-03-12', 'Team Member': 'John Doe', 'Category': 'Development', 'Project': 'Project A', 'Hours': '8', 'Comments': 'Working on feature Y'},
-                    {'Date': '2025-03-11', 'Team Member': 'John Doe', 'Category': 'Development', 'Project': 'Project B', 'Hours': '8', 'Comments': 'Working on feature Z'}
-                ]
-            })
+        if not isinstance(entry, dict):
+            reject("Entry must be an object")
+            continue
         
-        # Apply date filters if provided
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        entry_date = str(entry.get('date', '')).strip()
+        try:
+            entry_date = datetime.strptime(entry_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            reject(f"Invalid date '{entry_date}', expected YYYY-MM-DD")
+            continue
         
-        if start_date:
-            df = df[df['Date'] >= pd.to_datetime(start_date)]
+        team_member = str(entry.get('team_member', '')).strip()
+        if team_member not in known_team_members:
+            reject(f"Unknown team member '{team_member}'")
+            continue
         
-        if end_date:
-            df = df[df['Date'] <= pd.to_datetime(end_date)]
+        tasks = entry.get('tasks')
+        if not isinstance(tasks, list) or not tasks:
+            reject("At least one task must be added")
+            continue
         
-        # If filtering resulted in empty dataframe
-        if df.empty:
-            return jsonify({
-                'success': False,
-                'message': 'No data available for the selected date range'
-            })
+        entry_rows = []
+        entry_new_projects = []
+        for task_number, task in enumerate(tasks):
+            if not isinstance(task, dict):
+                reject(f"Task {task_number + 1} must be an object")
+                break
+            
+            category = str(task.get('category', '')).strip()
+            product_family = str(task.get('product_family', '')).strip()
+            if category not in known_categories:
+                reject(f"Task {task_number + 1} has unknown category '{category}'")
+                break
+            if not product_family:
+                reject(f"Product Family is required for all tasks. Task {task_number + 1} is missing a Product Family.")
+                break
+            if product_family not in known_product_families:
+                reject(f"Task {task_number + 1} has unknown product family '{product_family}'")
+                break
+            
+            hours = task.get('hours')
+            if hours in (None, ''):
+                # Split the day's total evenly, as the form does when hours are missing
+                try:
+                    hours = round(float(entry.get('hours', 8)) / len(tasks), 1)
+                except (TypeError, ValueError):
+                    reject(f"Invalid hours '{entry.get('hours')}'")
+                    break
+            try:
+                hours = float(hours)
+            except (TypeError, ValueError):
+                hours = 0.0
+            if hours <= 0:
+                reject(f"Task {task_number + 1} has invalid hours '{task.get('hours')}'")
+                break
+            
+            project, is_new_project = resolve_project(str(task.get('project', '') or ''), project_index,
+                                                      pending_projects)
+            if is_new_project:
+                entry_new_projects.append(project)
+            
+            entry_rows.append(build_log_row(entry_date, team_member, {
+                'category': category,
+                'product_family': product_family,
+                'project': project,
+                'hours': f"{hours:g}",
+                'comment': str(task.get('comment', '') or '')
+            }))
+        else:
+            rows.extend(entry_rows)
+            row_entries.extend([entry_number] * len(entry_rows))
+            new_projects.extend(entry_new_projects)
+            continue
         
-        # Generate timeline data (hours by date)
-        timeline_data = df.groupby(df['Date'].dt.strftime('%Y-%m-%d'))['Hours'].sum().to_dict()
+        # The entry was rejected, so later entries must not match the projects it introduced
+        for project in entry_new_projects:
+            pending_projects.remove(project)
+    
+    return rows, row_entries, errors, new_projects
+
+@app.route('/api/entries/bulk', methods=['POST'])
+def bulk_entries_api():
+    """
+    Write many days x team members x tasks in one request
+    
+    Expects JSON of the form
+    {"entries": [{"date": "YYYY-MM-DD", "team_member": "...", "hours": 8,
+                  "tasks": [{"category", "product_family", "project", "hours", "comment"}]}]}
+    Valid entries are written with a single batched append; invalid ones are reported back.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('entries'), list):
+        return jsonify({'success': False, 'message': "Expected a JSON object with an 'entries' list"}), 400
+    
+    # Validate everything once against the cached reference data
+    reference = get_reference_data()
+    if reference is None:
+        return jsonify({'success': False, 'message': 'Could not connect to Google Sheets'}), 503
+    
+    try:
+        rows, row_entries, errors, new_projects = build_bulk_rows(payload['entries'], reference)
+        status = 200 if rows or not errors else 400
         
-        # Create breakdown of hours by team member and category
-        # First create a cross-tabulation
-        team_category_pivot = pd.pivot_table(
-            df, 
-            values='Hours', 
-            index='Team Member', 
-            columns='Category', 
-            aggfunc='sum', 
-            fill_value=0
-        )
+        # Rows already in LOG (e.g. a re-run import) are skipped or flagged
+        flags = find_duplicate_rows(rows)
+        keep = [DUPLICATE_ENTRIES == 'flag' or not is_duplicate for is_duplicate in flags]
+        written_rows = [row for row, kept in zip(rows, keep) if kept]
         
-        # Convert to nested dictionary format
-        team_category_data = {}
-        for team_member in team_category_pivot.index:
-            team_category_data[team_member] = team_category_pivot.loc[team_member].to_dict()
+        if written_rows and not write_entries(written_rows, new_projects):
+            return jsonify({'success': False, 'message': 'Could not connect to Google Sheets'}), 503
         
-        # Create breakdown of hours by team member and project
-        team_project_pivot = pd.pivot_table(
-            df, 
-            values='Hours', 
-            index='Team Member', 
-            columns='Project', 
-            aggfunc='sum', 
-            fill_value=0
-        )
+        for error in errors:
+            print(f"Bulk entry {error['entry']} rejected: {error['message']}")
         
-        # Convert to nested dictionary format
-        team_project_data = {}
-        for team_member in team_project_pivot.index:
-            team_project_data[team_member] = team_project_pivot.loc[team_member].to_dict()
+        # An entry counts as written if any of its rows was; the rest were all skipped as duplicates
+        written_entries = sorted({entry for entry, kept in zip(row_entries, keep) if kept})
+        skipped_entries = set(row_entries).difference(written_entries)
         
-        # Process data for analytics
-        data = {
-            'success': True,
-            'summary': {
-                'total_hours': float(df['Hours'].sum()),
-                'total_entries': len(df),
-                'team_members': df['Team Member'].nunique(),
-                'categories': df['Category'].nunique(),
-                'projects': df['Project'].nunique(),
-                'date_range': {
-                    'start': df['Date'].min().strftime('%Y-%m-%d'),
-                    'end': df['Date'].max().strftime('%Y-%m-%d')
-                }
-            },
-            'by_category': df.groupby('Category')['Hours'].sum().to_dict(),
-            'by_team_member': df.groupby('Team Member')['Hours'].sum().to_dict(),
-            'by_project': df.groupby('Project')['Hours'].sum().to_dict(),
-            'by_date': timeline_data,
-            'recent_entries': df.sort_values('Date', ascending=False).head(10).to_dict('records'),
-            'by_team_member_category': team_category_data,
-            'by_team_member_project': team_project_data
-        }
+        return jsonify({
+            'success': not errors,
+            'written': len(written_entries),
+            'skipped_duplicates': len(skipped_entries),
+            'written_entries': written_entries,
+            'rows_written': len(written_rows),
+            'duplicate_rows': sum(flags),
+            'queued': WRITE_BEHIND,
+            'errors': errors
+        }), status
+    except Exception as e:
+        print(f"Error processing bulk entries: {e}")
+        reset_gsheet_connection()
+        return jsonify({
+            'success': False,
+            'message': f'Error processing entries: {str(e)}',
+            'error_type': str(type(e).__name__)
+        }), 500
+
+@app.route('/analytics')
+def analytics():
+    """Analytics dashboard route"""
+    return render_template('analytics.html')
+
+@app.route('/api/time-data')
+def time_data_api():
+    """API endpoint to get time tracking data"""
+    try:
+        refresh_log_snapshot()
+        version = _storage.version
+        
+        start_date = request.args.get('start_date', '')
+        end_date = request.args.get('end_date', '')
+        filters = parse_time_data_filters(request.args)
+        
+        # Identical queries against unchanged data share one computation and one ETag
+        cache_key = (start_date, end_date, tuple(sorted(filters.items())), version)
+        etag = hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()
         
-        return jsonify(data)
+        body = _time_data_cache.get(cache_key)
+        if body is None and not request.if_none_match.contains(etag):
+            with _time_data_lock:
+                body = _time_data_cache.get(cache_key)
+                if body is None:
+                    data = build_time_data(_storage, start_date, end_date, filters)
+                    with metrics.span('serialize'):
+                        body = app.json.dumps(data)
+                    _time_data_cache.put(cache_key, body)
+        
+        response = app.response_class(body or '', mimetype='application/json')
+        response.set_etag(etag)
+        # Let the browser keep the response but revalidate it on every fetch
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     except Exception as e:
         print(f"Error in API endpoint: {e}")
         # Return error with more details for debugging
@@ -492,6 +799,99 @@ def time_data_api():
             'error_type': str(type(e).__name__)
         })
 
+def parse_time_data_filters(args):
+    """
+    Read the dimension filters of an /api/time-data request
+    
+    Each parameter may be repeated (e.g. ?team_member=A&team_member=B) to accept several values.
+    
+    Parameters:
+    args (werkzeug.datastructures.MultiDict): The request's query parameters
+    
+    Returns:
+    dict: LOG column -> sorted tuple of accepted values, for the dimensions that are filtered
+    """
+    filters = {}
+    for param, column in TIME_DATA_FILTERS.items():
+        values = {value.strip() for value in args.getlist(param) if value.strip()}
+        if values:
+            filters[column] = tuple(sorted(values))
+    return filters
+
+def build_time_data(storage, start_date, end_date, filters=None):
+    """
+    Compute the /api/time-data payload
+    
+    The date range and dimension filters are handed to the storage engine, so
+    only the matching slice of LOG is aggregated.
+    
+    Parameters:
+    storage (SheetsStorage or SQLiteStorage): Where to read the entries from
+    start_date (str): First date to include, or empty for no lower bound
+    end_date (str): Last date to include, or empty for no upper bound
+    filters (dict, optional): LOG column -> accepted values, from parse_time_data_filters()
+    
+    Returns:
+    dict: The response payload
+    """
+    with metrics.span('has_entries'):
+        has_entries = storage.has_entries()
+    if not has_entries:
+        print("Warning: Log data is empty")
+        # For debugging purposes, let's return sample data
+        return {
+            'success': True,
+            'message': 'Note: Using sample data because the LOG sheet is empty',
+            'summary': {
+                'total_hours': 40,
+                'total_entries': 5,
+                'team_members': 2,
+                'categories': 3,
+                'projects': 2,
+                'date_range': {
+                    'start': '2025-03-10',
+                    'end': '2025-03-17'
+                }
+            },
+            'by_category': {'Development': 20, 'Testing': 10, 'Meetings': 10},
+            'by_team_member': {'John Doe': 25, 'Jane Smith': 15},
+            'by_project': {'Project A': 30, 'Project B': 10},
+            'by_date': {'2025-03-10': 8, '2025-03-11': 8, '2025-03-12': 8, '2025-03-13': 8, '2025-03-14': 8},
+            'recent_entries': [
+                {'Date': '2025-03-14', 'Team Member': 'John Doe', 'Category': 'Development', 'Project': 'Project A', 'Hours': '8', 'Comments': 'Working on feature X'},
+                {'Date': '2025-03-13', 'Team Member': 'Jane Smith', 'Category': 'Testing', 'Project': 'Project A', 'Hours': '5', 'Comments': 'Testing feature X'},
+                {'Date': '2025-03-13', 'Team Member': 'Jane Smith', 'Category': 'Meetings', 'Project': 'Project B', 'Hours': '3', 'Comments': 'Planning meeting'},
+                {'Date': '2025-03-12', 'Team Member': 'John Doe', 'Category': 'Development', 'Project': 'Project A', 'Hours': '8', 'Comments': 'Working on feature Y'},
+                {'Date': '2025-03-11', 'Team Member': 'John Doe', 'Category': 'Development', 'Project': 'Project B', 'Hours': '8', 'Comments': 'Working on feature Z'}
+            ]
+        }
+    
+    # Apply date filters if provided
+    start_date = pd.to_datetime(start_date) if start_date else None
+    end_date = pd.to_datetime(end_date) if end_date else None
+    
+    # Sum the pre-aggregated day buckets instead of the raw entries
+    with metrics.span('daily_buckets'):
+        buckets = storage.daily_buckets(start_date, end_date, filters)
+    
+    # If filtering resulted in empty dataframe
+    if buckets.empty:
+        return {
+            'success': False,
+            'message': 'No data available for the selected filters' if filters else 'No data available for the selected date range'
+        }
+    
+    # Process data for analytics
+    data = {'success': True}
+    with metrics.span('summarize'):
+        data.update(summarize(buckets))
+    
+    # The ten most recent entries still come from the raw rows
+    with metrics.span('recent_entries'):
+        data['recent_entries'] = storage.recent_entries(start_date, end_date, limit=10, filters=filters)
+    
+    return data
+
 if __name__ == '__main__':
     app.run()  # remove debug=true
     #app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -1,7 +1,11 @@
 import pandas as pd
-import requests
 from datetime import datetime
-import time
+from excel_reader import parse_duration_series
+from submission_engine import create_session, to_bulk_entry, post_bulk_entries, written_entries, chunked
+from import_journal import ImportJournal
+
+# Base URL of the time tracking application (assuming the app is running locally)
+APP_URL = "http://localhost:5000"
 
 def process_excel_time_entries(excel_file_path):
     """
@@ -29,14 +33,20 @@ def process_excel_time_entries(excel_file_path):
         if excel_col in df.columns:
             processed_df[app_col] = df[excel_col]
     
+    # Convert durations ('7:00', 0.5, ...) to float hours and drop rows that have none
+    processed_df['Hours'], unparseable = parse_duration_series(processed_df['Hours'])
+    for idx in unparseable:
+        print(f"Could not parse hours in row {idx+1}: {df.at[idx, 'Hours (Fractional)']}")
+    processed_df = processed_df[processed_df['Hours'] > 0].copy()
+    
     # Ensure dates are in the correct format (YYYY-MM-DD)
     processed_df['Date'] = pd.to_datetime(processed_df['Date']).dt.strftime('%Y-%m-%d')
     
     # Group entries by date and team member
     grouped = processed_df.groupby(['Date', 'Team Member'])
     
-    # Process each group (date + team member combination)
-    total_submitted = 0
+    # Build one entry per group (date + team member combination)
+    entries = []
     
     for (date, team_member), group in grouped:
         # Calculate total hours for this date/person
@@ -53,22 +63,30 @@ def process_excel_time_entries(excel_file_path):
             }
             tasks.append(task)
         
-        # Submit this group's entries
-        success = submit_time_entry(date, team_member, total_hours, tasks)
-        if success:
-            total_submitted += 1
-            print(f"Successfully submitted entry for {team_member} on {date}")
+        entries.append(to_bulk_entry(date, team_member, total_hours, tasks))
+    
+    # Skip the groups a previous (possibly interrupted) run already submitted
+    journal = ImportJournal()
+    entries, skipped = journal.pending(entries)
+    if skipped:
+        print(f"Skipping {skipped} time entry groups already submitted by an earlier run")
+    
+    # Send the entries in a few bulk requests instead of one request per group
+    session = create_session()
+    total_submitted = 0
+    
+    for batch in chunked(entries):
+        if submit_time_entries(batch, session, journal):
+            total_submitted += len(batch)
+            print(f"Successfully submitted {len(batch)} entries")
         else:
-            print(f"Failed to submit entry for {team_member} on {date}")
-        
-        # Add a small delay to avoid overwhelming the server
-        time.sleep(0.5)
+            print(f"Failed to submit all of {len(batch)} entries")
     
     print(f"\nComplete! Successfully submitted {total_submitted} time entry groups.")
 
 def submit_time_entry(date, team_member, total_hours, tasks):
     """
-    Submit a time entry to the application via POST request
+    Submit a time entry to the application
     
     Parameters:
     date (str): Date in YYYY-MM-DD format
@@ -79,31 +97,33 @@ def submit_time_entry(date, team_member, total_hours, tasks):
     Returns:
     bool: True if submission was successful, False otherwise
     """
-    # URL for the form submission (assuming the app is running locally)
-    url = "http://localhost:5000/form"
-    
-    # Prepare the form data
-    form_data = {
-        'entry_date': date,
-        'team_member': team_member,
-        'hours': str(total_hours),
-        'time_balance': 'on'  # Checkbox is checked
-    }
+    return submit_time_entries([to_bulk_entry(date, team_member, total_hours, tasks)])
+
+def submit_time_entries(entries, session=None, journal=None):
+    """
+    Submit many time entries via the application's bulk JSON endpoint
     
-    # Add the tasks data
-    for i, task in enumerate(tasks):
-        form_data[f'tasks[{i}][category]'] = task['category']
-        form_data[f'tasks[{i}][project]'] = task['project']
-        form_data[f'tasks[{i}][hours]'] = str(task['hours'])
-        form_data[f'tasks[{i}][comment]'] = task['comment']
+    Parameters:
+    entries (list): Entries built with to_bulk_entry()
+    session (requests.Session, optional): Session to reuse across calls
+    journal (ImportJournal, optional): Journal to record the written entries in
     
+    Returns:
+    bool: True if every entry was written, False otherwise
+    """
     try:
-        # Send POST request to the form
-        response = requests.post(url, data=form_data)
-        return response.status_code == 200 or response.status_code == 302  # 302 is redirect after success
+        success, errors, written = post_bulk_entries(session or create_session(), APP_URL, entries)
     except Exception as e:
-        print(f"Error submitting entry: {e}")
+        print(f"Error submitting entries: {e}")
         return False
+    
+    if journal:
+        journal.mark_committed(written_entries(entries, written))
+    for error in errors:
+        entry = entries[error['entry']] if isinstance(error.get('entry'), int) else None
+        label = f"{entry['team_member']} on {entry['date']}: " if entry else ""
+        print(f"Rejected {label}{error['message']}")
+    return success
 
 if __name__ == "__main__":
     # Example usage
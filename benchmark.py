@@ -0,0 +1,176 @@
+"""
+Benchmark of the /form and /api/time-data request paths against an offline fake of the Google Sheet
+
+Drives the Flask routes through the test client with synthetic LOG sizes and
+reports p50/p99 latency and Sheets API calls per request. Nothing touches the
+live spreadsheet or the app's data directory.
+
+Usage:
+    python benchmark.py                          # 1k, 100k and 1M LOG rows
+    python benchmark.py --sizes 1000,100000 --requests 100 --latency 0.05
+    python benchmark.py --storage sqlite --write-behind 0
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+import numpy as np
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the app's request paths against a fake Google Sheet")
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help="Comma-separated LOG row counts (default: 1000,100000,1000000)")
+    parser.add_argument('--requests', type=int, default=50, help="Requests per scenario (default: 50)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Seconds of latency injected into every Sheets call (default: 0)")
+    parser.add_argument('--storage', choices=['sheets', 'sqlite'], default='sheets',
+                        help="Storage engine to benchmark (default: sheets)")
+    parser.add_argument('--write-behind', choices=['0', '1'], default='1',
+                        help="Queue form submissions instead of writing them during the request (default: 1)")
+    parser.add_argument('--verbose', action='store_true', help="Show the app's own output")
+    return parser.parse_args()
+
+def configure_environment(args, workdir):
+    """Point the app's settings at a scratch directory; must run before app is imported"""
+    os.environ['STORAGE_BACKEND'] = args.storage
+    os.environ['WRITE_BEHIND'] = args.write_behind
+    os.environ['SQLITE_STORAGE_PATH'] = os.path.join(workdir, 'time_tracker.sqlite3')
+    os.environ['LOG_SNAPSHOT_PATH'] = os.path.join(workdir, 'log_snapshot.pkl')
+    os.environ['WRITE_QUEUE_PATH'] = os.path.join(workdir, 'write_queue.sqlite3')
+    # Queued writes are drained explicitly so their Sheets calls are not counted against a request
+    os.environ['WRITE_QUEUE_FLUSH_INTERVAL'] = '86400'
+
+def reset_app(app_module, spreadsheet, args, workdir, size):
+    """Give the app fresh storage, caches and write queue bound to a new fake spreadsheet"""
+    from storage import SheetsStorage, SQLiteStorage
+    from write_queue import WriteQueue
+
+    sheets = SheetsStorage(app_module.GOOGLE_SHEET_KEY, app_module.SERVICE_ACCOUNT_FILE)
+    storage = sheets
+    if args.storage == 'sqlite':
+        storage = SQLiteStorage(os.path.join(workdir, f'time_tracker_{size}.sqlite3'))
+        storage.import_from(sheets)
+        spreadsheet.calls.reset()
+
+    app_module._storage = storage
+    app_module._sheets = sheets
+    app_module._write_queue = WriteQueue(os.path.join(workdir, f'write_queue_{size}.sqlite3'),
+                                         app_module.flush_queued_writes, flush_interval=86400)
+    app_module.invalidate_reference_data()
+    app_module._time_data_cache.clear()
+
+def form_submission(i, reference):
+    """Build a distinct one-task form submission, so none of them is skipped as a duplicate"""
+    return {
+        'team_member': reference['team_members'][i % len(reference['team_members'])],
+        'entry_date': (date.today() - timedelta(days=i % 30)).isoformat(),
+        'hours': '8',
+        'tasks[0][category]': reference['categories'][i % len(reference['categories'])],
+        'tasks[0][product_family]': reference['product_families'][i % len(reference['product_families'])],
+        'tasks[0][project]': reference['projects'][i % len(reference['projects'])],
+        'tasks[0][hours]': '8',
+        'tasks[0][comment]': f"Benchmark entry {i} {time.time_ns()}"
+    }
+
+def time_data_query(i):
+    """A different date range for every i, so each query misses the response cache"""
+    end = date.today() - timedelta(days=i % 60)
+    return {'start_date': (end - timedelta(days=7 + i % 90)).isoformat(), 'end_date': end.isoformat()}
+
+def person_week_query(i):
+    """A one-week, one-team-member query, the most common dashboard view"""
+    end = date.today() - timedelta(days=i % 60)
+    return {'start_date': (end - timedelta(days=6)).isoformat(), 'end_date': end.isoformat(),
+            'team_member': f"Member {i % 25:03d}"}
+
+def measure(client, spreadsheet, send, count, quiet):
+    """
+    Send count requests and record their latency and Sheets calls
+
+    Returns:
+    tuple: (latencies in seconds, Sheets calls per request)
+    """
+    latencies, calls = [], []
+    for i in range(count):
+        before = spreadsheet.calls.total
+        with quiet():
+            started = time.perf_counter()
+            response = send(client, i)
+            latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f"Request {i} failed with status {response.status_code}")
+        calls.append(spreadsheet.calls.total - before)
+    return latencies, calls
+
+def report(name, latencies, calls):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"  {name:<34} n={len(latencies):<5} p50={p50:9.2f} ms  p99={p99:9.2f} ms  "
+          f"calls/request={np.mean(calls):6.2f}")
+
+def run_size(app_module, args, workdir, size, quiet):
+    from fake_gsheets import build_spreadsheet, install
+
+    print(f"\nLOG rows: {size:,}")
+    started = time.perf_counter()
+    spreadsheet = build_spreadsheet(log_rows=size, latency=args.latency)
+    restore = install(spreadsheet)
+    try:
+        with quiet():
+            reset_app(app_module, spreadsheet, args, workdir, size)
+        print(f"  (synthetic sheet built in {time.perf_counter() - started:.1f} s)")
+
+        client = app_module.app.test_client()
+        scenarios = [
+            # The first query downloads and parses LOG (or reads the SQLite table) from scratch
+            ('GET /api/time-data (cold)', 1,
+             lambda c, i: c.get('/api/time-data', query_string=time_data_query(i))),
+            ('GET /api/time-data', args.requests,
+             lambda c, i: c.get('/api/time-data', query_string=time_data_query(i + 1))),
+            ('GET /api/time-data (person, week)', args.requests,
+             lambda c, i: c.get('/api/time-data', query_string=person_week_query(i))),
+            ('GET /api/time-data (repeat query)', args.requests,
+             lambda c, i: c.get('/api/time-data', query_string=time_data_query(0))),
+            ('GET /form', args.requests, lambda c, i: c.get('/form')),
+            ('POST /form', args.requests,
+             lambda c, i: c.post('/form', data=form_submission(i, app_module.get_reference_data()))),
+        ]
+        for name, count, send in scenarios:
+            latencies, calls = measure(client, spreadsheet, send, count, quiet)
+            report(name, latencies, calls)
+
+        queued = app_module._write_queue.pending_count()
+        if queued:
+            before = spreadsheet.calls.total
+            started = time.perf_counter()
+            with quiet():
+                app_module._write_queue.drain()
+            print(f"  write queue: {queued} queued writes flushed in {(time.perf_counter() - started) * 1000:.2f} ms "
+                  f"with {spreadsheet.calls.total - before} Sheets calls")
+    finally:
+        restore()
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    with tempfile.TemporaryDirectory(prefix='timetracker-benchmark-') as workdir:
+        configure_environment(args, workdir)
+        import app as app_module
+
+        devnull = open(os.devnull, 'w')
+
+        def quiet():
+            if args.verbose:
+                return contextlib.nullcontext()
+            return contextlib.redirect_stdout(devnull)
+
+        print(f"storage={args.storage} write_behind={args.write_behind} latency={args.latency * 1000:.0f} ms/call "
+              f"requests={args.requests}")
+        for size in sizes:
+            run_size(app_module, args, workdir, size, quiet)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,26 +1,30 @@
 ﻿import pandas as pd
-import gspread
 import os
-from difflib import get_close_matches
 import re
 from pprint import pprint
+from storage import create_storage, find_column
+from project_index import CommentMatchEngine
 
 class CommentProjectMatcher:
     def __init__(self, google_sheet_key='1gmK-3cT9hdRfXdG8FV4YMti6mgKVIBLarufkLQDvzeA', 
-                 service_account_path='keys/dt-resource-tracker-db3f71699674.json'):
+                 service_account_path='keys/dt-resource-tracker-db3f71699674.json', storage=None):
         """
         Initialize the Comment Project Matcher
         
         Parameters:
         google_sheet_key (str): The key of the Google Sheet containing the LOG data
         service_account_path (str): Path to the Google service account credentials file
+        storage (SheetsStorage or SQLiteStorage, optional): Storage to work on, by default the one selected by STORAGE_BACKEND
         """
         self.google_sheet_key = google_sheet_key
         self.service_account_path = service_account_path
+        self.storage = storage or create_storage(google_sheet_key, service_account_path)
         self.projects = []
         self.log_data = None
         self.updated_rows = 0
         self.fuzzy_match_threshold = 0.8  # Threshold for fuzzy matching (0.0 to 1.0)
+        self._match_engine = None  # Compiled from self.projects on first use
+        self._match_engine_projects = None
         
     def normalize_text(self, text):
         """Normalize text for better fuzzy matching"""
@@ -34,6 +38,23 @@ class CommentProjectMatcher:
         text = re.sub(r'\s+', ' ', text)
         return text.strip()
         
+    def get_match_engine(self, projects):
+        """
+        Return the compiled matching engine for a project list, building it only when needed
+        
+        Parameters:
+        projects (list): List of project names to search for
+        
+        Returns:
+        CommentMatchEngine: Engine for the project list and current fuzzy threshold
+        """
+        if (self._match_engine is None or
+                self._match_engine_projects is not projects or
+                self._match_engine.threshold != self.fuzzy_match_threshold):
+            self._match_engine = CommentMatchEngine(projects, threshold=self.fuzzy_match_threshold)
+            self._match_engine_projects = projects
+        return self._match_engine
+        
     def find_project_in_comment(self, comment, projects):
         """
         Look for a project name in a comment using fuzzy matching
@@ -52,67 +73,26 @@ class CommentProjectMatcher:
         normalized_comment = self.normalize_text(comment)
         if not normalized_comment:
             return None
-            
-        # Normalize project names
-        normalized_projects = {self.normalize_text(p): p for p in projects if p and isinstance(p, str)}
         
-        # First try direct substring matching (case-insensitive)
-        for norm_proj, orig_proj in normalized_projects.items():
-            if norm_proj and norm_proj in normalized_comment:
-                print(f"Direct match found: '{orig_proj}' in '{comment}'")
-                return orig_proj
-        
-        # If no direct substring match, try word-level fuzzy matching
-        comment_words = normalized_comment.split()
-        for word in comment_words:
-            if len(word) < 3:  # Skip very short words
-                continue
-                
-            # Try fuzzy matching with word
-            matches = get_close_matches(word, normalized_projects.keys(), n=1, cutoff=self.fuzzy_match_threshold)
-            if matches:
-                matched_proj = normalized_projects[matches[0]]
-                print(f"Fuzzy match found: '{word}' → '{matched_proj}' in '{comment}'")
-                return matched_proj
-                
-        # If still no match, try matching against multi-word phrases in the comment
-        for phrase_length in range(2, min(5, len(comment_words) + 1)):
-            for i in range(len(comment_words) - phrase_length + 1):
-                phrase = ' '.join(comment_words[i:i+phrase_length])
-                
-                # Try fuzzy matching with phrase
-                matches = get_close_matches(phrase, normalized_projects.keys(), n=1, cutoff=self.fuzzy_match_threshold)
-                if matches:
-                    matched_proj = normalized_projects[matches[0]]
-                    print(f"Phrase fuzzy match found: '{phrase}' → '{matched_proj}' in '{comment}'")
-                    return matched_proj
-        
-        return None
-    
-    def connect_to_gsheet(self):
-        """Connect to the Google Sheet and return the worksheet"""
-        try:
-            print(f"Connecting to Google Sheet with key: {self.google_sheet_key}")
-            gc = gspread.service_account(filename=self.service_account_path)
-            sh = gc.open_by_key(self.google_sheet_key)
-            return sh
-        except Exception as e:
-            print(f"Error connecting to Google Sheet: {e}")
+        # Exact substring pass through the automaton, then word and phrase fuzzy passes
+        result = self.get_match_engine(projects).match(normalized_comment)
+        if result is None:
             return None
+        
+        matched_proj, kind, matched_text = result
+        if kind == 'direct':
+            print(f"Direct match found: '{matched_proj}' in '{comment}'")
+        elif kind == 'word':
+            print(f"Fuzzy match found: '{matched_text}' → '{matched_proj}' in '{comment}'")
+        else:
+            print(f"Phrase fuzzy match found: '{matched_text}' → '{matched_proj}' in '{comment}'")
+        return matched_proj
     
     def load_projects(self):
-        """Load project list from the backend data worksheet"""
-        sh = self.connect_to_gsheet()
-        if not sh:
-            print("Failed to connect to Google Sheet. Cannot load projects.")
-            return False
-            
+        """Load project list from the backend data"""
         try:
-            # Access the worksheet with project data
-            worksheet = sh.worksheet("BACKEND DATA FOR APP.PY")
-            
             # Get all projects from column 4
-            all_projects = worksheet.col_values(4)[1:]  # Skip header
+            all_projects = self.storage.reference_columns()[3]
             
             # Filter out empty values and duplicates
             self.projects = [proj for proj in all_projects if proj and proj.strip()]
@@ -135,27 +115,13 @@ class CommentProjectMatcher:
             return False
     
     def load_log_data(self):
-        """Load all log data from the LOG worksheet"""
-        sh = self.connect_to_gsheet()
-        if not sh:
-            print("Failed to connect to Google Sheet. Cannot load log data.")
-            return False
-            
+        """Load all log data from the LOG storage, indexed by row id (the sheet row number for Sheets)"""
         try:
-            # Access the LOG worksheet
-            log_worksheet = sh.worksheet('LOG')
-            
-            # Get all values including headers
-            data = log_worksheet.get_all_values()
+            self.log_data = self.storage.read_log()
             
-            if not data:
+            if self.log_data.empty:
                 print("LOG sheet is empty")
                 return False
-                
-            # Convert to DataFrame
-            headers = data[0]
-            records = data[1:]
-            self.log_data = pd.DataFrame(records, columns=headers)
             
             # Print summary information
             print(f"Loaded {len(self.log_data)} log entries")
@@ -189,12 +155,8 @@ class CommentProjectMatcher:
             print("No log data loaded. Call load_log_data() first.")
             return False
         
-        # Prepare a project column index
-        project_col_index = None
-        for i, col in enumerate(self.log_data.columns):
-            if col.strip().lower() == 'project':
-                project_col_index = i
-                break
+        # Prepare a project column index (the write-back looks the column up the same way)
+        project_col_index = find_column(self.log_data.columns, 'Project')
                 
         if project_col_index is None:
             print("Project column not found in log data")
@@ -212,43 +174,44 @@ class CommentProjectMatcher:
             print("Comments column not found in log data")
             return False
             
-        # Process each row
-        updated_entries = []
-        updates_by_project = {}
+        # Select rows without a project but with a comment using vectorized masks
+        log = self.log_data
+        projects_col = log.iloc[:, project_col_index].astype(str).str.strip()
+        comments_col = log.iloc[:, comments_col_index].astype(str)
+        candidates = (projects_col == '') & (comments_col.str.strip() != '')
+        comments = comments_col[candidates]
         
-        for index, row in self.log_data.iterrows():
-            # Skip rows that already have a project
-            project = str(row.iloc[project_col_index]).strip()
-            if project:
-                continue
-                
-            # Get the comment
-            comment = str(row.iloc[comments_col_index])
-            
-            # Skip rows without comments
-            if not comment or comment.strip() == "":
-                continue
-                
-            # Try to find a project in the comment
-            matched_project = self.find_project_in_comment(comment, self.projects)
-            
-            if matched_project:
-                # Store the update for later
-                updated_entries.append({
-                    'index': index,
-                    'row_index': index + 2,  # +2 because 0-indexing and header row
-                    'old_project': project,
-                    'new_project': matched_project,
-                    'comment': comment,
-                    'team_member': row.iloc[1] if len(row) > 1 else "",  # Team Member is usually in column 2
-                    'category': row.iloc[2] if len(row) > 2 else "",     # Category is usually in column 3
-                    'date': row.iloc[0] if len(row) > 0 else ""          # Date is usually in column 1
-                })
-                
-                # Update count by project
-                if matched_project not in updates_by_project:
-                    updates_by_project[matched_project] = 0
-                updates_by_project[matched_project] += 1
+        # Normalize every comment in one pass (same rules as normalize_text)
+        normalized = (comments.str.lower()
+                      .str.replace(r'[^\w\s]', '', regex=True)
+                      .str.replace(r'\s+', ' ', regex=True)
+                      .str.strip())
+        normalized = normalized[normalized != '']
+        
+        # Match each distinct comment exactly once, then map the results back to every row
+        distinct = normalized.drop_duplicates()
+        print(f"Matching {len(distinct)} distinct comments across {len(normalized)} rows without a project")
+        matches = {norm: self.find_project_in_comment(comments[idx], self.projects)
+                   for idx, norm in distinct.items()}
+        matched = normalized.map(matches).dropna()
+        
+        def column(position):
+            # Date, Team Member and Category are usually in columns 1-3
+            if len(log.columns) > position:
+                return log.iloc[:, position][matched.index].values
+            return ""
+        
+        updated_entries = pd.DataFrame({
+            'index': matched.index,
+            'row_index': matched.index,  # Row id in storage (sheet row number for Sheets)
+            'old_project': projects_col[matched.index].values,
+            'new_project': matched.values,
+            'comment': comments[matched.index].values,
+            'team_member': column(1),
+            'category': column(2),
+            'date': column(0)
+        }).to_dict('records')
+        updates_by_project = matched.value_counts().to_dict()
         
         # Print summary of proposed updates
         if updated_entries:
@@ -271,7 +234,7 @@ class CommentProjectMatcher:
             # If not a dry run, apply the updates
             if not dry_run:
                 print("\nApplying updates...")
-                self.apply_updates(updated_entries, project_col_index)
+                self.apply_updates(updated_entries)
             else:
                 print("\nDRY RUN MODE: No changes applied. Run with dry_run=False to apply changes.")
         else:
@@ -280,53 +243,18 @@ class CommentProjectMatcher:
         self.updated_rows = len(updated_entries)
         return True
     
-    def apply_updates(self, updates, project_col_index):
+    def apply_updates(self, updates):
         """
-        Apply the updates to the Google Sheet
+        Write the matched projects back to storage (batched range updates for Sheets)
         
         Parameters:
         updates (list): List of update dictionaries
-        project_col_index (int): Index of the project column
         
         Returns:
         bool: True if successful, False otherwise
         """
-        sh = self.connect_to_gsheet()
-        if not sh:
-            print("Failed to connect to Google Sheet. Cannot apply updates.")
-            return False
-            
         try:
-            # Access the LOG worksheet
-            log_worksheet = sh.worksheet('LOG')
-            
-            # Process updates in smaller batches to avoid API limits
-            batch_size = 10  # Smaller batch size to reduce likelihood of errors
-            total_updated = 0
-            
-            print(f"Applying updates in batches of {batch_size}...")
-            
-            # Process updates in batches
-            for i in range(0, len(updates), batch_size):
-                batch = updates[i:i+batch_size]
-                
-                for update in batch:
-                    row = update['row_index']
-                    col = project_col_index + 1  # +1 because gspread uses 1-indexing for columns
-                    new_project = update['new_project']
-                    
-                    # Update cell one at a time
-                    log_worksheet.update_cell(row, col, new_project)
-                    total_updated += 1
-                
-                print(f"  Progress: {total_updated}/{len(updates)} entries updated")
-                
-                # Add a small delay between batches to avoid rate limiting
-                if i + batch_size < len(updates):
-                    import time
-                    time.sleep(1)
-            
-            print(f"Successfully updated {total_updated} entries")
+            self.storage.update_projects({update['row_index']: update['new_project'] for update in updates})
             return True
         except Exception as e:
             print(f"Error applying updates: {e}")
@@ -0,0 +1,11 @@
+import os
+
+# Google Sheet holding the BACKEND DATA and LOG worksheets
+GOOGLE_SHEET_KEY = '1gmK-3cT9hdRfXdG8FV4YMti6mgKVIBLarufkLQDvzeA'
+
+# Path to the service account key
+SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keys',
+                                    'dt-resource-tracker-db3f71699674.json')
+
+# With the SQLite engine, copy every write to the Google Sheet in the background (SHEETS_MIRROR=0 to disable)
+SHEETS_MIRROR = os.environ.get('SHEETS_MIRROR', '1') != '0'
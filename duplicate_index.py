@@ -0,0 +1,81 @@
+import threading
+import pandas as pd
+
+# LOG columns that identify an entry; two rows agreeing on all of them are duplicates
+FINGERPRINT_COLUMNS = ['Date', 'Team Member', 'Category', 'Project', 'Hours', 'Comments']
+
+def fingerprints(df):
+    """
+    Return the fingerprint of every LOG row in a frame
+
+    Typed snapshot frames and raw rows produce the same fingerprints, so rows
+    about to be written can be looked up against what the sheet already holds.
+
+    Parameters:
+    df (pandas.DataFrame): LOG rows, with Date and Hours either typed or as sheet strings
+
+    Returns:
+    list: One hashable tuple per row
+    """
+    if df.empty:
+        return []
+
+    columns = []
+    for column in FINGERPRINT_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series('', index=df.index)
+        if column == 'Date':
+            values = pd.to_datetime(values, errors='coerce').dt.strftime('%Y-%m-%d').fillna('')
+        elif column == 'Hours':
+            values = pd.to_numeric(values, errors='coerce').astype(float).round(4).astype(str)
+        else:
+            values = values.fillna('').astype(str).str.strip()
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+class DuplicateIndex:
+    """In-memory set of LOG row fingerprints for constant-time duplicate checks"""
+
+    def __init__(self):
+        self._fingerprints = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def add(self, df):
+        """
+        Add LOG rows to the index
+
+        Parameters:
+        df (pandas.DataFrame): LOG rows (see fingerprints())
+        """
+        new = fingerprints(df)
+        with self._lock:
+            self._fingerprints.update(new)
+
+    def remove(self, df):
+        """Drop LOG rows from the index, e.g. queued rows once they show up in the sheet"""
+        gone = fingerprints(df)
+        with self._lock:
+            self._fingerprints.difference_update(gone)
+
+    def add_rows(self, rows, headers):
+        """Add raw row value lists, as written with append_rows()"""
+        self.add(pd.DataFrame(rows, columns=headers))
+
+    def find(self, rows, headers):
+        """
+        Check raw rows against the index
+
+        Parameters:
+        rows (list): Row value lists in LOG column order
+        headers (list): LOG column names
+
+        Returns:
+        list: True for every row that is already in LOG
+        """
+        if not rows:
+            return []
+        candidates = fingerprints(pd.DataFrame(rows, columns=headers))
+        with self._lock:
+            return [fingerprint in self._fingerprints for fingerprint in candidates]
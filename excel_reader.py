@@ -0,0 +1,139 @@
+import os
+import pandas as pd
+
+# Columns the import tools use from a Wrike export; everything else is skipped while reading
+IMPORT_COLUMNS = ['Date', 'Person', 'Category', 'Comment', 'Hours', 'Hours (Fractional)', 'Product Family']
+
+# Rows per yielded chunk
+CHUNK_SIZE = 5000
+
+def iter_excel_chunks(file_path, columns=IMPORT_COLUMNS, chunksize=CHUNK_SIZE):
+    """
+    Stream a spreadsheet export as DataFrame chunks holding only the wanted columns
+
+    .xlsx files are read with openpyxl in read-only mode, so rows are streamed
+    from disk. .xls files are read with xlrd (the format itself is capped at
+    65,536 rows), and .csv files with pandas' chunked reader. The index of each
+    chunk is the row's position in the file, so row numbers stay meaningful.
+
+    Parameters:
+    file_path (str): Path to the .xlsx, .xls or .csv file
+    columns (list): Column names to keep; missing ones are simply absent from the chunks
+    chunksize (int): Maximum rows per chunk
+
+    Yields:
+    pandas.DataFrame: The next chunk of rows
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == '.csv':
+        reader = pd.read_csv(file_path, usecols=lambda name: name in columns, chunksize=chunksize)
+        yield from reader
+        return
+
+    if extension == '.xls':
+        rows = _iter_xls_rows(file_path)
+    else:
+        rows = _iter_xlsx_rows(file_path)
+
+    header = next(rows, None)
+    if header is None:
+        return
+
+    positions = [(i, name) for i, name in enumerate(header) if name in columns]
+    names = [name for _, name in positions]
+
+    chunk = []
+    start = 0
+    for row in rows:
+        chunk.append([row[i] if i < len(row) else None for i, _ in positions])
+        if len(chunk) >= chunksize:
+            yield pd.DataFrame(chunk, columns=names, index=range(start, start + len(chunk)))
+            start += len(chunk)
+            chunk = []
+
+    if chunk or start == 0:
+        yield pd.DataFrame(chunk, columns=names, index=range(start, start + len(chunk)))
+
+def _iter_xlsx_rows(file_path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+def _iter_xls_rows(file_path):
+    import xlrd
+
+    # on_demand only loads the sheet that is actually read
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for r in range(sheet.nrows):
+            values = []
+            for cell in sheet.row(r):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    # Match pandas: date cells become datetimes, time-only cells become times
+                    value = xlrd.xldate_as_datetime(cell.value, workbook.datemode)
+                    values.append(value.time() if cell.value < 1 else value)
+                elif cell.ctype == xlrd.XL_CELL_EMPTY:
+                    values.append(None)
+                else:
+                    values.append(cell.value)
+            yield values
+    finally:
+        workbook.release_resources()
+
+def parse_dates(series):
+    """
+    Convert a column of dates (datetimes or strings) to 'YYYY-MM-DD' strings in one pass
+
+    Values in an unexpected format are retried individually; anything that still
+    cannot be parsed comes back as None.
+
+    Parameters:
+    series (pandas.Series): Raw Date column
+
+    Returns:
+    pandas.Series: Formatted dates, None where unparseable
+    """
+    parsed = pd.to_datetime(series, errors='coerce')
+
+    # The vectorized parse infers one format; give odd rows a second, per-value chance
+    retry = parsed.isna() & series.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(series[retry], errors='coerce', format='mixed')
+
+    formatted = parsed.dt.strftime('%Y-%m-%d')
+    return formatted.where(parsed.notna(), None)
+
+# H:MM or H:MM:SS, as Wrike writes durations ('7:00', '00:30:00')
+_DURATION_PATTERN = r'^\s*(\d+(?:\.\d+)?):(\d{1,2})(?::(\d{1,2}(?:\.\d+)?))?\s*$'
+
+def parse_duration_series(series):
+    """
+    Convert a column of durations to float hours in one vectorized pass
+
+    Accepts numbers, numeric strings, 'H:MM' / 'H:MM:SS' strings and time-of-day
+    values (how Excel stores durations). Missing values stay NaN; values that
+    are present but cannot be parsed also become NaN and are reported.
+
+    Parameters:
+    series (pandas.Series): Raw Hours or Hours (Fractional) column
+
+    Returns:
+    tuple: (pandas.Series of float hours, list of index labels that could not be parsed)
+    """
+    hours = pd.to_numeric(series, errors='coerce').astype(float)
+
+    remaining = hours.isna() & series.notna()
+    if remaining.any():
+        # time objects render as HH:MM:SS, so one regex covers them and the strings
+        parts = series[remaining].astype(str).str.extract(_DURATION_PATTERN).astype(float)
+        hours[remaining] = parts[0] + parts[1] / 60 + parts[2].fillna(0) / 3600
+
+    unparseable = hours.isna() & series.notna()
+    return hours, list(series.index[unparseable])
@@ -0,0 +1,264 @@
+import re
+import threading
+import time
+from collections import Counter
+import numpy as np
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+import sheets_client
+
+class CallCounter:
+    """Thread-safe count of fake Sheets API calls per (worksheet, method)"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, worksheet, method):
+        with self._lock:
+            self._counts[(worksheet, method)] += 1
+
+    def snapshot(self):
+        """Return a copy of the counts so far"""
+        with self._lock:
+            return Counter(self._counts)
+
+    @property
+    def total(self):
+        with self._lock:
+            return sum(self._counts.values())
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+class FakeWorksheet:
+    """
+    In-memory stand-in for gspread.Worksheet
+
+    Implements the calls the app and tools make (get, get_all_values,
+    col_values, row_values, update, append_rows, batch_update). Every call is
+    counted and delayed by the spreadsheet's injected latency.
+    """
+
+    def __init__(self, spreadsheet, title, rows=None, worksheet_id=0):
+        """
+        Parameters:
+        spreadsheet (FakeSpreadsheet): Owning spreadsheet, which holds the latency and call counter
+        title (str): Worksheet name
+        rows (list): Initial cell values, one list of strings per row
+        worksheet_id (int): Worksheet id
+        """
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = worksheet_id
+        self.rows = rows if rows is not None else []
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        self.spreadsheet._call(self.title, method)
+
+    def get_all_values(self, **kwargs):
+        self._call('get_all_values')
+        with self._lock:
+            width = max((len(row) for row in self.rows), default=0)
+            return [row + [''] * (width - len(row)) if len(row) < width else list(row) for row in self.rows]
+
+    def get(self, range_name=None, major_dimension=None, **kwargs):
+        self._call('get')
+        first_row, first_col, last_row, last_col = _parse_range(range_name)
+        with self._lock:
+            rows = self.rows[first_row - 1:last_row]
+            values = [_trim([row[c - 1] if c <= len(row) else '' for c in range(first_col, last_col + 1)])
+                      for row in rows]
+        # Like the API, trailing empty rows (and columns) are left out
+        values = _trim(values)
+        if major_dimension == 'COLUMNS':
+            width = last_col - first_col + 1
+            return _trim([_trim([row[i] if i < len(row) else '' for row in values]) for i in range(width)])
+        return values
+
+    def col_values(self, col, **kwargs):
+        self._call('col_values')
+        with self._lock:
+            return _trim([row[col - 1] if col <= len(row) else '' for row in self.rows])
+
+    def row_values(self, row, **kwargs):
+        self._call('row_values')
+        with self._lock:
+            return _trim(list(self.rows[row - 1])) if row <= len(self.rows) else []
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._call('update')
+        with self._lock:
+            self._write(range_name, values)
+
+    def batch_update(self, data, **kwargs):
+        self._call('batch_update')
+        with self._lock:
+            for value_range in data:
+                self._write(value_range['range'], value_range['values'])
+
+    def append_rows(self, values, **kwargs):
+        self._call('append_rows')
+        with self._lock:
+            self.rows.extend([str(value) for value in row] for row in values)
+
+    def append_row(self, values, **kwargs):
+        self._call('append_row')
+        with self._lock:
+            self.rows.append([str(value) for value in values])
+
+    def _write(self, range_name, values):
+        first_row, first_col, _, _ = _parse_range(range_name)
+        for i, row_values in enumerate(values):
+            row_number = first_row + i
+            while len(self.rows) < row_number:
+                self.rows.append([])
+            row = self.rows[row_number - 1]
+            for j, value in enumerate(row_values):
+                col = first_col + j
+                while len(row) < col:
+                    row.append('')
+                row[col - 1] = str(value)
+
+class FakeSpreadsheet:
+    """
+    In-memory stand-in for gspread.Spreadsheet with injected latency and call counting
+
+    latency is added to every call (seconds); latency_by_method overrides it
+    for individual methods, e.g. {'get_all_values': 2.0}.
+    """
+
+    def __init__(self, key='fake-sheet', latency=0.0, latency_by_method=None):
+        self.id = key
+        self.latency = latency
+        self.latency_by_method = latency_by_method or {}
+        self.calls = CallCounter()
+        self._worksheets = {}
+
+    def _call(self, worksheet, method):
+        self.calls.add(worksheet, method)
+        delay = self.latency_by_method.get(method, self.latency)
+        if delay:
+            time.sleep(delay)
+
+    def worksheet(self, title):
+        self._call('meta', 'worksheet')
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def worksheets(self):
+        self._call('meta', 'worksheets')
+        return list(self._worksheets.values())
+
+    def add_worksheet(self, title, rows=100, cols=20, **kwargs):
+        self._call('meta', 'add_worksheet')
+        worksheet = FakeWorksheet(self, title, worksheet_id=len(self._worksheets))
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def set_rows(self, title, rows):
+        """Create (or replace) a worksheet with the given rows, without counting a call"""
+        worksheet = FakeWorksheet(self, title, rows, worksheet_id=len(self._worksheets))
+        self._worksheets[title] = worksheet
+        return worksheet
+
+def _parse_range(range_name):
+    """Return (first row, first col, last row or None, last col) of an A1 range like 'A2:D' or 'E5'"""
+    match = re.fullmatch(r'([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?', range_name)
+    if not match:
+        raise ValueError(f"Unsupported range '{range_name}'")
+    start_col_letters, start_row, end_col_letters, end_row = match.groups()
+    first_row, first_col = a1_to_rowcol(f"{start_col_letters}{start_row or 1}")
+    if end_col_letters is None:
+        return first_row, first_col, first_row if start_row else None, first_col
+    _, last_col = a1_to_rowcol(f"{end_col_letters}1")
+    return first_row, first_col, int(end_row) if end_row else None, last_col
+
+def _trim(values):
+    values = list(values)
+    while values and values[-1] in ('', []):
+        values.pop()
+    return values
+
+# Column layouts used by build_spreadsheet(), matching the real sheet
+BACKEND_HEADERS = ['Team Member', 'Category', 'Product Family', 'Project']
+LOG_HEADERS = ['Date', 'Team Member', 'Category', 'Product Family', 'Project', 'Hours', 'Comments']
+
+def build_spreadsheet(log_rows=1000, team_members=25, categories=8, product_families=12, projects=300,
+                      days=730, seed=0, latency=0.0, latency_by_method=None):
+    """
+    Create a fake spreadsheet with synthetic BACKEND DATA and LOG worksheets
+
+    Parameters:
+    log_rows (int): Number of LOG entries
+    team_members, categories, product_families, projects (int): Sizes of the reference lists
+    days (int): Number of days the LOG entries are spread over, ending today
+    seed (int): Random seed, so runs are comparable
+    latency (float): Seconds added to every call
+    latency_by_method (dict, optional): Per-method latency overrides
+
+    Returns:
+    FakeSpreadsheet: The populated spreadsheet
+    """
+    rng = np.random.default_rng(seed)
+    members = [f"Member {i:03d}" for i in range(team_members)]
+    category_names = [f"Category {i}" for i in range(categories)]
+    families = [f"Family {i}" for i in range(product_families)]
+    project_names = [f"Project {i:04d} {word}" for i, word in
+                     zip(range(projects), rng.choice(['Housing', 'Valve', 'Bracket', 'Sensor', 'Cap'], projects))]
+
+    backend = [BACKEND_HEADERS]
+    for i in range(max(team_members, categories, product_families, projects)):
+        backend.append([
+            members[i] if i < team_members else '',
+            category_names[i] if i < categories else '',
+            families[i] if i < product_families else '',
+            project_names[i] if i < projects else ''
+        ])
+
+    # Draw every column at once, then zip; the values repeat, so the strings are shared
+    dates = [str(d) for d in np.datetime64('today', 'D') - np.arange(days)[::-1]]
+    hours = ['0.5', '1', '1.5', '2', '3', '4', '8']
+    comments = ['Design review', 'Testing', 'Customer call', 'Drawing updates', 'Team meeting'] + \
+               [f"Work on {name}" for name in project_names[:50]]
+    columns = [
+        sorted(rng.integers(0, days, log_rows)),  # LOG is appended in date order
+        rng.integers(0, team_members, log_rows),
+        rng.integers(0, categories, log_rows),
+        rng.integers(0, product_families, log_rows),
+        rng.integers(-projects // 3, projects, log_rows),  # Negative means no project yet
+        rng.integers(0, len(hours), log_rows),
+        rng.integers(0, len(comments), log_rows)
+    ]
+    log = [LOG_HEADERS]
+    log.extend(
+        [dates[d], members[m], category_names[c], families[f], project_names[p] if p >= 0 else '', hours[h], comments[k]]
+        for d, m, c, f, p, h, k in zip(*columns)
+    )
+
+    spreadsheet = FakeSpreadsheet(latency=latency, latency_by_method=latency_by_method)
+    spreadsheet.set_rows('BACKEND DATA FOR APP.PY', backend)
+    spreadsheet.set_rows('LOG', log)
+    return spreadsheet
+
+def install(spreadsheet):
+    """
+    Make sheets_client hand out the fake spreadsheet instead of opening the real one
+
+    Parameters:
+    spreadsheet (FakeSpreadsheet): The fake to serve
+
+    Returns:
+    callable: Restores the real sheets_client.get_spreadsheet
+    """
+    original = sheets_client.get_spreadsheet
+    sheets_client.invalidate()
+    sheets_client.get_spreadsheet = lambda sheet_key, service_account_path: spreadsheet
+
+    def restore():
+        sheets_client.get_spreadsheet = original
+        sheets_client.invalidate()
+    return restore
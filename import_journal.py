@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# Local checkpoint of submitted time entry groups, shared by the import tools
+JOURNAL_PATH = os.environ.get('IMPORT_JOURNAL_PATH', 'import_journal.sqlite3')
+
+class ImportJournal:
+    """
+    Record of the time entry groups that have already been written to LOG
+
+    Each (date, team member, tasks) group is keyed by a hash of its content, so
+    re-running an import after a crash or a dropped connection only submits the
+    groups that did not make it, and importing the same file twice is a no-op.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        """
+        Parameters:
+        path (str): SQLite file holding the journal
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Shared between the submission worker threads, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS committed_groups (
+                fingerprint TEXT PRIMARY KEY,
+                date TEXT,
+                team_member TEXT,
+                committed_at TEXT
+            )
+        ''')
+        self._conn.commit()
+
+    @staticmethod
+    def fingerprint(entry):
+        """Return the content hash of an entry built with to_bulk_entry()"""
+        payload = json.dumps(entry, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def pending(self, entries):
+        """
+        Drop the entries that were already committed by an earlier run
+
+        Parameters:
+        entries (list): Entries built with to_bulk_entry()
+
+        Returns:
+        tuple: (entries still to submit, number of entries skipped)
+        """
+        fingerprints = [self.fingerprint(entry) for entry in entries]
+        committed = set()
+        with self._lock:
+            # Stay well below SQLite's bound parameter limit
+            for i in range(0, len(fingerprints), 500):
+                batch = fingerprints[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT fingerprint FROM committed_groups WHERE fingerprint IN ({placeholders})', batch
+                )
+                committed.update(row[0] for row in rows)
+
+        remaining = [entry for entry, key in zip(entries, fingerprints) if key not in committed]
+        return remaining, len(entries) - len(remaining)
+
+    def mark_committed(self, entries):
+        """
+        Record entries the app has written
+
+        Parameters:
+        entries (list): Entries built with to_bulk_entry()
+        """
+        if not entries:
+            return
+
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [(self.fingerprint(entry), entry['date'], entry['team_member'], now) for entry in entries]
+        with self._lock:
+            self._conn.executemany('INSERT OR IGNORE INTO committed_groups VALUES (?, ?, ?, ?)', rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,340 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+from aggregates import DailyAggregateCube
+from duplicate_index import DuplicateIndex
+
+# Seconds between full re-downloads, which pick up edits made to existing rows
+FULL_RELOAD_INTERVAL = float(os.environ.get('LOG_SNAPSHOT_FULL_RELOAD', '3600'))
+
+# Seconds during which the snapshot is served without asking the sheet for new rows
+REFRESH_INTERVAL = float(os.environ.get('LOG_REFRESH_INTERVAL', '10'))
+
+# Seconds between saves of the snapshot after top-ups; full reloads and shutdown always save
+SAVE_INTERVAL = float(os.environ.get('LOG_SNAPSHOT_SAVE_INTERVAL', '300'))
+
+class LogSnapshot:
+    """
+    Local, typed copy of the LOG sheet that is topped up incrementally
+
+    The first load downloads the whole sheet. Afterwards only the rows past the
+    last one seen are fetched, starting with that last row again so that a
+    deleted or rewritten tail is detected and triggers a full reload. The typed
+    frame (Date as datetime64, Hours as float) is pickled to disk so a restart
+    does not have to download or re-parse the history. Saving happens on a
+    background thread and at most every save_interval seconds, so a top-up
+    never waits for the whole snapshot to be written. The frame is kept sorted
+    by date (sheet order within a day, undated rows last) so date ranges can be
+    sliced out with binary search. A DailyAggregateCube is
+    kept in step with the frame for range queries, and a DuplicateIndex for
+    duplicate checks on the write path.
+    """
+
+    def __init__(self, headers, snapshot_path=None, sheet_key=None, full_reload_interval=FULL_RELOAD_INTERVAL,
+                 refresh_interval=REFRESH_INTERVAL, save_interval=SAVE_INTERVAL):
+        """
+        Parameters:
+        headers (list): Columns every snapshot frame is guaranteed to have
+        snapshot_path (str, optional): Where to persist the snapshot; kept in memory only if omitted
+        sheet_key (str, optional): Key of the spreadsheet, used to reject snapshots of another sheet
+        full_reload_interval (float): Seconds between full re-downloads
+        refresh_interval (float): Seconds between checks for new rows
+        save_interval (float): Seconds between saves after top-ups
+        """
+        self.headers = list(headers)
+        self.snapshot_path = snapshot_path
+        self.sheet_key = sheet_key
+        self.full_reload_interval = full_reload_interval
+        self.refresh_interval = refresh_interval
+        self.save_interval = save_interval
+        self.checked_at = 0.0
+        self.saved_at = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._written_generation = -1
+
+        # Changes whenever the data changes; the token keeps versions unique across restarts
+        self._version_token = uuid.uuid4().hex[:8]
+        self._generation = 0
+        # Rows queued for LOG but not seen in the sheet yet; kept across full reloads
+        self.queued = DuplicateIndex()
+        self._reset()
+        self._load_from_disk()
+        if snapshot_path:
+            # Top-ups since the last timed save are written when the process exits
+            atexit.register(self.save)
+
+    def _reset(self):
+        self.df = self._build_frame([], self.headers)
+        self.cube = DailyAggregateCube()
+        self.duplicates = DuplicateIndex()
+        self.sheet_headers = list(self.headers)
+        self.row_count = 0  # Data rows seen, excluding the header row
+        self.last_row = None  # Raw values of the last data row, used to detect edits to the tail
+        self.loaded_at = 0.0
+
+    def refresh(self, worksheet):
+        """
+        Bring the snapshot up to date with the LOG worksheet
+
+        Parameters:
+        worksheet (gspread.Worksheet): The LOG worksheet
+
+        Returns:
+        pandas.DataFrame: The typed snapshot (treat as read-only)
+        """
+        with self._lock:
+            if time.time() - self.checked_at < self.refresh_interval:
+                return self.df
+            self.checked_at = time.time()
+
+            needs_full_reload = (
+                self.row_count == 0 or
+                time.time() - self.loaded_at > self.full_reload_interval
+            )
+
+            if not needs_full_reload:
+                # Re-read the last known row as well, to check the tail has not changed
+                start_row = self.row_count + 1  # +1 for the header row
+                last_column = rowcol_to_a1(1, len(self.sheet_headers)).rstrip('0123456789')
+                values = worksheet.get(f'A{start_row}:{last_column}')
+                values = [self._pad(row) for row in values]
+
+                if values and values[0] == self.last_row:
+                    new_rows = values[1:]
+                    if new_rows:
+                        self._append(new_rows)
+                        print(f"LOG snapshot topped up with {len(new_rows)} new rows ({self.row_count} total)")
+                        self._save_to_disk(force=False)
+                    return self.df
+
+                print("LOG snapshot tail changed, reloading the whole sheet")
+
+            self._full_reload(worksheet)
+            return self.df
+
+    @property
+    def version(self):
+        """Identifier of the current data, usable as a cache key or ETag component"""
+        return f"{self._version_token}-{self._generation}"
+
+    def current(self):
+        """
+        Return the snapshot frame, its aggregate cube and their data version as a consistent triple
+
+        Returns:
+        tuple: (pandas.DataFrame, DailyAggregateCube, str)
+        """
+        with self._lock:
+            return self.df, self.cube, self.version
+
+    def record_appended(self, rows, written=True):
+        """
+        Make rows this process just appended (or queued for appending) known to the duplicate index right away
+
+        They are kept in the queued index until a refresh finds them in the
+        sheet, so a full reload in between does not forget them. Does not wait
+        for a refresh that is in progress.
+
+        Parameters:
+        rows (list): Row value lists in the order of the snapshot's headers
+        written (bool): Whether the rows are in the sheet already, so the next refresh should look for them
+        """
+        self.queued.add_rows(rows, self.headers)
+        if written:
+            self.checked_at = 0.0
+
+    def find_duplicates(self, rows):
+        """
+        Return True for every row (ordered like the snapshot's headers) that is already in LOG
+
+        Only the in-memory indexes are consulted, without waiting for a refresh
+        that is in progress, so a write never waits for the sheet.
+        """
+        in_log = self.duplicates.find(rows, self.headers)
+        queued = self.queued.find(rows, self.headers)
+        return [a or b for a, b in zip(in_log, queued)]
+
+    def mark_stale(self):
+        """Check the sheet on the next refresh, e.g. after this process wrote to LOG"""
+        with self._lock:
+            self.checked_at = 0.0
+
+    def invalidate(self):
+        """Force a full reload on the next refresh"""
+        with self._lock:
+            self.row_count = 0
+            self.checked_at = 0.0
+
+    def _full_reload(self, worksheet):
+        data = worksheet.get_all_values()
+        # Duplicate checks keep using the previous index until the new one is complete
+        previous_duplicates = self.duplicates
+        self._reset()
+        duplicates, self.duplicates = self.duplicates, previous_duplicates
+        self._generation += 1
+        self.loaded_at = time.time()
+
+        if data:
+            self.sheet_headers = list(data[0])
+            self.df = self._build_frame([], self.sheet_headers)
+            self._append([self._pad(row) for row in data[1:]], duplicates)
+        self.duplicates = duplicates
+
+        print(f"LOG snapshot loaded with {self.row_count} rows")
+        self._save_to_disk()
+
+    def _append(self, rows, duplicates=None):
+        new_df = self._build_frame(rows, self.sheet_headers)
+        self.df = self._merge_by_date(new_df)
+        self.cube.add(new_df)
+        (self.duplicates if duplicates is None else duplicates).add(new_df)
+        # Queued rows that reached the sheet are now covered by the main index
+        if len(self.queued):
+            self.queued.remove(new_df)
+        self._generation += 1
+        self.row_count += len(rows)
+        if rows:
+            self.last_row = rows[-1]
+
+    def _merge_by_date(self, new_df):
+        """
+        Return the snapshot frame with new rows merged in by date
+
+        Only the dated rows from the earliest new day onwards are re-sorted;
+        rows appended in date order (the usual case) need no sorting at all.
+        Undated rows stay at the end in sheet order.
+        """
+        new_df = new_df.sort_values('Date', kind='stable', na_position='last', ignore_index=True)
+        if self.df.empty:
+            return new_df
+
+        dates = self.df['Date'].to_numpy()
+        new_dates = new_df['Date'].to_numpy()
+        dated_stop = int(np.searchsorted(dates, np.datetime64('NaT'), side='left'))
+        new_dated_stop = int(np.searchsorted(new_dates, np.datetime64('NaT'), side='left'))
+
+        first = dated_stop
+        if new_dated_stop:
+            # side='right' puts new rows after existing ones of the same day, as in the sheet
+            first = int(np.searchsorted(dates[:dated_stop], new_dates[0], side='right'))
+        middle = new_df.iloc[:new_dated_stop]
+        if first < dated_stop:
+            middle = pd.concat([self.df.iloc[first:dated_stop], middle]).sort_values('Date', kind='stable')
+
+        pieces = [self.df.iloc[:first], middle, self.df.iloc[dated_stop:], new_df.iloc[new_dated_stop:]]
+        return pd.concat([piece for piece in pieces if len(piece)], ignore_index=True)
+
+    def _sort_by_date(self, df):
+        """Fully sort a frame by date, undated rows last, unless it already is"""
+        dated = int(df['Date'].notna().sum())
+        if df['Date'].iloc[:dated].is_monotonic_increasing and df['Date'].iloc[dated:].isna().all():
+            return df
+        return df.sort_values('Date', kind='stable', na_position='last', ignore_index=True)
+
+    def _pad(self, row):
+        width = len(self.sheet_headers)
+        row = [str(value) for value in row[:width]]
+        return row + [''] * (width - len(row))
+
+    def _build_frame(self, rows, sheet_headers):
+        df = pd.DataFrame(rows, columns=sheet_headers)
+
+        # Make sure every expected column exists even if the header row is incomplete
+        for column in self.headers:
+            if column not in df.columns:
+                df[column] = ''
+
+        # Convert date strings to datetime objects
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+
+        # Convert hours to numeric
+        df['Hours'] = pd.to_numeric(df['Hours'], errors='coerce')
+
+        return df
+
+    def _load_from_disk(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+
+        try:
+            state = pd.read_pickle(self.snapshot_path)
+            if state.get('sheet_key') != self.sheet_key:
+                print("Ignoring LOG snapshot from a different spreadsheet")
+                return
+
+            # Snapshots saved before the frame was kept sorted are sorted on load
+            self.df = self._sort_by_date(state['df'])
+            self.sheet_headers = state['sheet_headers']
+            self.row_count = state['row_count']
+            self.last_row = state['last_row']
+            self.loaded_at = state['loaded_at']
+            self.cube.add(self.df)
+            self.duplicates.add(self.df)
+            self._generation += 1
+            print(f"Loaded LOG snapshot from disk with {self.row_count} rows")
+        except Exception as e:
+            print(f"Error loading LOG snapshot, will download it again: {e}")
+            self._reset()
+
+    def save(self):
+        """Write the snapshot to disk now if it changed since the last save"""
+        with self._lock:
+            if not self.snapshot_path or not self._dirty:
+                return
+            state, generation = self._capture_state()
+        self._write_state(state, generation)
+
+    def _capture_state(self):
+        # Called with the lock held; the frame is replaced, never modified, so a reference is enough
+        self.saved_at = time.time()
+        self._dirty = False
+        state = {
+            'sheet_key': self.sheet_key,
+            'df': self.df,
+            'sheet_headers': self.sheet_headers,
+            'row_count': self.row_count,
+            'last_row': self.last_row,
+            'loaded_at': self.loaded_at
+        }
+        return state, self._generation
+
+    def _save_to_disk(self, force=True):
+        """Schedule a background save (called with the lock held); without force, at most every save_interval"""
+        if not self.snapshot_path:
+            return
+
+        if not force and time.time() - self.saved_at < self.save_interval:
+            self._dirty = True
+            return
+
+        state, generation = self._capture_state()
+        threading.Thread(target=self._write_state, args=(state, generation),
+                         name='log-snapshot-save', daemon=True).start()
+
+    def _write_state(self, state, generation):
+        with self._write_lock:
+            # A slower, older save must not overwrite a newer one
+            if generation <= self._written_generation:
+                return
+            if self._write_file(state):
+                self._written_generation = generation
+
+    def _write_file(self, state):
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+
+            # Write to a temporary file first so a crash never leaves a half-written snapshot
+            temp_path = f"{self.snapshot_path}.tmp"
+            pd.to_pickle(state, temp_path)
+            os.replace(temp_path, self.snapshot_path)
+            return True
+        except Exception as e:
+            print(f"Error saving LOG snapshot: {e}")
+            return False
@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+
+# Histogram bucket upper bounds in seconds, from a cached lookup to a full LOG download
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Histogram bucket upper bounds for per-request Sheets call counts
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    """Monotonic counter with labels, rendered in the Prometheus text format"""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, rendered in the Prometheus text format"""
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        # Counts per bucket are stored non-cumulatively and summed up when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock seconds spent in the block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, [("le", le)])} {cumulative}')
+                labels = _format_labels(self.label_names, key)
+                lines.append(f'{self.name}_sum{labels} {_format_value(series["sum"])}')
+                lines.append(f'{self.name}_count{labels} {series["count"]}')
+        return lines
+
+class Registry:
+    """Named collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'timetracker_request_duration_seconds', 'Time spent handling HTTP requests', ['route', 'method', 'status'])
+SPAN_SECONDS = REGISTRY.histogram(
+    'timetracker_span_duration_seconds', 'Time spent in instrumented sections of a request', ['route', 'span'])
+SHEETS_CALL_SECONDS = REGISTRY.histogram(
+    'timetracker_sheets_call_duration_seconds', 'Time spent in Google Sheets API calls', ['route', 'call'])
+SHEETS_CALLS = REGISTRY.counter(
+    'timetracker_sheets_calls_total', 'Google Sheets API calls', ['route', 'call'])
+SHEETS_ERRORS = REGISTRY.counter(
+    'timetracker_sheets_call_errors_total', 'Google Sheets API calls that raised an error', ['route', 'call'])
+SHEETS_CALLS_PER_REQUEST = REGISTRY.histogram(
+    'timetracker_sheets_calls_per_request', 'Google Sheets API calls made while handling one request', ['route'],
+    buckets=CALL_COUNT_BUCKETS)
+
+def current_route():
+    """Return the Flask endpoint being handled, or 'background' outside a request (e.g. the write queue)"""
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'background'
+
+@contextmanager
+def span(name):
+    """
+    Time a section of the current request
+
+    Parameters:
+    name (str): Label of the section, e.g. 'fuzzy_match'
+    """
+    with SPAN_SECONDS.time(route=current_route(), span=name):
+        yield
+
+@contextmanager
+def sheets_call(name):
+    """
+    Time and count one Google Sheets API call, attributed to the current route
+
+    Parameters:
+    name (str): Label of the call, e.g. 'get_all_values'
+    """
+    route = current_route()
+    if has_request_context():
+        g.sheets_calls = g.get('sheets_calls', 0) + 1
+    SHEETS_CALLS.inc(route=route, call=name)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SHEETS_ERRORS.inc(route=route, call=name)
+        raise
+    finally:
+        SHEETS_CALL_SECONDS.observe(time.perf_counter() - started, route=route, call=name)
+
+class InstrumentedWorksheet:
+    """
+    Proxy around a gspread Worksheet that records every method call with sheets_call()
+
+    Attributes such as title and id are passed through untouched.
+    """
+
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+
+    def __getattr__(self, name):
+        attribute = getattr(self._worksheet, name)
+        if not callable(attribute) or name.startswith('_'):
+            return attribute
+
+        def call(*args, **kwargs):
+            with sheets_call(name):
+                return attribute(*args, **kwargs)
+        return call
+
+def instrument_app(app):
+    """Record the duration and Sheets call count of every request handled by a Flask app"""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        g.sheets_calls = 0
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            route = current_route()
+            REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                    route=route, method=request.method, status=response.status_code)
+            SHEETS_CALLS_PER_REQUEST.observe(g.get('sheets_calls', 0), route=route)
+        return response
@@ -0,0 +1,350 @@
+import re
+import threading
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+def normalize_text(text):
+    """Normalize text for better fuzzy matching"""
+    if not text or not isinstance(text, str):
+        return ""
+    # Convert to lowercase
+    text = text.lower()
+    # Remove special characters and extra spaces
+    text = re.sub(r'[^\w\s]', '', text)
+    # Replace multiple spaces with a single space
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+def trigrams(text):
+    """Return the set of character trigrams of an already normalized string, padded so short names have some"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ProjectIndex:
+    """
+    Pre-normalized project names with an exact-match map and a trigram candidate index
+
+    Fuzzy lookups only score the handful of names sharing the most trigrams
+    with the input, instead of running difflib against every project.
+    """
+
+    # Number of trigram candidates that are scored with difflib
+    MAX_CANDIDATES = 25
+
+    def __init__(self, projects=()):
+        """
+        Parameters:
+        projects (iterable): Project names to index
+        """
+        self._lock = threading.RLock()
+        self._originals = {}  # normalized name -> original name
+        self._grams = {}  # normalized name -> set of trigrams
+        self._postings = defaultdict(set)  # trigram -> normalized names containing it
+        for project in projects:
+            self.add(project)
+
+    def __len__(self):
+        return len(self._originals)
+
+    def __contains__(self, project):
+        return normalize_text(project) in self._originals
+
+    def add(self, project):
+        """Add a project name to the index (no-op for empty names)"""
+        normalized = normalize_text(project)
+        if not normalized:
+            return
+
+        with self._lock:
+            self._originals[normalized] = project
+            if normalized not in self._grams:
+                grams = trigrams(normalized)
+                self._grams[normalized] = grams
+                for gram in grams:
+                    self._postings[gram].add(normalized)
+
+    def remove(self, project):
+        """Remove a project name from the index"""
+        normalized = normalize_text(project)
+        with self._lock:
+            if self._originals.pop(normalized, None) is None:
+                return
+            for gram in self._grams.pop(normalized):
+                names = self._postings[gram]
+                names.discard(normalized)
+                if not names:
+                    del self._postings[gram]
+
+    def sync(self, projects):
+        """
+        Incrementally bring the index in line with a project list
+
+        Parameters:
+        projects (iterable): The complete, current list of project names
+        """
+        wanted = {normalize_text(p): p for p in projects if normalize_text(p)}
+        with self._lock:
+            for normalized in [n for n in self._originals if n not in wanted]:
+                self.remove(self._originals[normalized])
+            for normalized, project in wanted.items():
+                if self._originals.get(normalized) != project:
+                    self.add(project)
+
+    def names(self):
+        """Return the normalized names in the index"""
+        with self._lock:
+            return list(self._originals)
+
+    def find_exact(self, text, normalized=False):
+        """Return the project whose normalized name equals the input, or None"""
+        key = text if normalized else normalize_text(text)
+        return self._originals.get(key)
+
+    def find_close(self, text, threshold=0.7, normalized=False):
+        """
+        Return the best matching project name for the input, or None
+
+        Parameters:
+        text (str): The text to match
+        threshold (float): The similarity threshold for considering a match (0.0 to 1.0)
+        normalized (bool): Whether text is already normalized
+
+        Returns:
+        str or None: The original project name
+        """
+        key = text if normalized else normalize_text(text)
+        if not key:
+            return None
+
+        exact = self._originals.get(key)
+        if exact is not None:
+            return exact
+
+        match = self.best_match(key, threshold)
+        return self._originals.get(match) if match else None
+
+    def best_match(self, normalized_text, threshold=0.7):
+        """
+        Return the normalized project name most similar to an already normalized input
+
+        Scores the same way as difflib.get_close_matches(n=1), but only over the
+        trigram candidates.
+        """
+        with self._lock:
+            candidates = self.candidates(normalized_text)
+
+            matcher = SequenceMatcher()
+            matcher.set_seq2(normalized_text)
+            best_name, best_score = None, threshold
+            for name in candidates:
+                matcher.set_seq1(name)
+                if (matcher.real_quick_ratio() >= best_score and
+                        matcher.quick_ratio() >= best_score):
+                    score = matcher.ratio()
+                    if score > best_score or (score == best_score and best_name is None):
+                        best_name, best_score = name, score
+            return best_name
+
+    def candidates(self, normalized_text, limit=MAX_CANDIDATES):
+        """
+        Return the normalized names sharing at least one trigram with an already normalized input
+
+        Parameters:
+        normalized_text (str): The text to look up
+        limit (int or None): Keep only this many, the most similar first; None keeps all of them
+
+        Returns:
+        list: Normalized names
+        """
+        grams = trigrams(normalized_text)
+        with self._lock:
+            shared = defaultdict(int)
+            for gram in grams:
+                for name in self._postings.get(gram, ()):
+                    shared[name] += 1
+
+            if limit is not None and len(shared) <= limit:
+                return list(shared)
+
+            # Rank by Dice coefficient so long names with many trigrams do not crowd out close short ones
+            scores = {name: 2 * count / (len(grams) + len(self._grams[name])) for name, count in shared.items()}
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting every occurrence of a set of patterns in one pass over the text"""
+
+    def __init__(self, patterns):
+        """
+        Parameters:
+        patterns (iterable): Non-empty strings to search for
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern in patterns:
+            if pattern:
+                self._insert(pattern)
+        self._build_failure_links()
+
+    def _insert(self, pattern):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build_failure_links(self):
+        # Breadth-first, so every failure target is finished before it is used
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """
+        Yield (end_position, pattern) for every pattern occurrence in text
+
+        end_position is the index one past the last matched character.
+        """
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                yield position + 1, pattern
+
+class CommentMatchEngine:
+    """
+    Finds the project a free-text comment refers to
+
+    Built once per run: normalized project names are compiled into an
+    Aho-Corasick automaton for the exact substring pass and a ProjectIndex
+    (trigram inverted index) for the word and phrase fuzzy passes. Fuzzy
+    results are memoized per word/phrase, since comments share vocabulary.
+    """
+
+    def __init__(self, projects, threshold=0.8):
+        """
+        Parameters:
+        projects (iterable): Project names to look for
+        threshold (float): The similarity threshold for fuzzy matches (0.0 to 1.0)
+        """
+        self.threshold = threshold
+        self.index = ProjectIndex(p for p in projects if p and isinstance(p, str))
+        self.automaton = AhoCorasick(self.index.names())
+        self._fuzzy_cache = {}
+
+    def match(self, normalized_comment):
+        """
+        Look for a project in an already normalized comment
+
+        Parameters:
+        normalized_comment (str): Output of normalize_text() for the comment
+
+        Returns:
+        tuple or None: (project name, match kind, matched text) where kind is 'direct', 'word' or 'phrase'
+        """
+        if not normalized_comment:
+            return None
+
+        # Exact substring pass; prefer the longest (most specific) project name
+        best = None
+        for _, pattern in self.automaton.find_all(normalized_comment):
+            if best is None or len(pattern) > len(best):
+                best = pattern
+        if best is not None:
+            return self.index.find_exact(best, normalized=True), 'direct', best
+
+        # Word-level fuzzy pass
+        comment_words = normalized_comment.split()
+        for word in comment_words:
+            if len(word) < 3:  # Skip very short words
+                continue
+            project = self._fuzzy(word)
+            if project:
+                return project, 'word', word
+
+        # Multi-word phrases of two to four words
+        for phrase_length in range(2, min(5, len(comment_words) + 1)):
+            for i in range(len(comment_words) - phrase_length + 1):
+                phrase = ' '.join(comment_words[i:i + phrase_length])
+                project = self._fuzzy(phrase)
+                if project:
+                    return project, 'phrase', phrase
+
+        return None
+
+    def _fuzzy(self, text):
+        if text not in self._fuzzy_cache:
+            match = self.index.best_match(text, self.threshold)
+            self._fuzzy_cache[text] = self.index.find_exact(match, normalized=True) if match else None
+        return self._fuzzy_cache[text]
+
+class NameResolver:
+    """
+    Maps free-form names (team members, categories) onto a fixed list of canonical names
+
+    Names are normalized once into a ProjectIndex. Each distinct input is
+    resolved once (exact match, then containment, then similarity ranking)
+    and the result is memoized, so a large import with a few dozen distinct
+    names does a few dozen lookups.
+    """
+
+    def __init__(self, names, threshold=0.7):
+        """
+        Parameters:
+        names (iterable): Canonical names
+        threshold (float): The similarity threshold for fuzzy matches (0.0 to 1.0)
+        """
+        self.names = [name for name in names if name]
+        self.threshold = threshold
+        self.index = ProjectIndex(self.names)
+        self._resolved = {}
+
+    def resolve(self, name):
+        """
+        Return the canonical name for an input, or None if nothing is close enough
+
+        Parameters:
+        name (str): The name as written in the import file
+
+        Returns:
+        str or None: One of the canonical names
+        """
+        if name in self._resolved:
+            return self._resolved[name]
+
+        normalized = normalize_text(name)
+        result = self.index.find_exact(normalized, normalized=True)
+        if result is None and normalized:
+            result = self._containing(normalized) or self.index.find_close(normalized, self.threshold, normalized=True)
+
+        self._resolved[name] = result
+        return result
+
+    def remember(self, name, canonical):
+        """Memoize a resolution made elsewhere, e.g. chosen by the user"""
+        self._resolved[name] = canonical
+
+    def _containing(self, normalized):
+        # A name containing the input (or contained in it) shares trigrams with it, so only
+        # the trigram candidates need checking, e.g. 'travis' -> 'Travis King'. All of them:
+        # a long containing name can rank below the top few by similarity.
+        for candidate in self.index.candidates(normalized, limit=None):
+            if normalized in candidate or candidate in normalized:
+                return self.index.find_exact(candidate, normalized=True)
+        return None
@@ -0,0 +1,139 @@
+import threading
+import gspread
+from requests.adapters import HTTPAdapter
+from metrics import InstrumentedWorksheet, sheets_call
+
+# Size of the keep-alive connection pool shared by every request thread
+HTTP_POOL_SIZE = 20
+
+class SheetsClientPool:
+    """
+    Process-wide cache of authenticated gspread clients, spreadsheets and worksheets
+
+    gspread clients wrap a google-auth AuthorizedSession, which refreshes the
+    OAuth token by itself when it expires, so a single client can be kept for
+    the life of the process instead of re-authenticating on every request.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE):
+        self.pool_size = pool_size
+        self._lock = threading.RLock()
+        self._clients = {}
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._service_accounts = {}  # Sheet key -> service account file it was opened with
+
+    def get_client(self, service_account_path):
+        """Return the shared gspread client for a service account file, creating it if needed"""
+        with self._lock:
+            client = self._clients.get(service_account_path)
+            if client is None:
+                print(f"Authenticating with Google service account: {service_account_path}")
+                with sheets_call('auth'):
+                    client = gspread.service_account(filename=service_account_path)
+                self._mount_pool(client)
+                self._clients[service_account_path] = client
+            return client
+
+    def get_spreadsheet(self, sheet_key, service_account_path):
+        """
+        Return the shared spreadsheet handle for a sheet key
+
+        Parameters:
+        sheet_key (str): The key from the Google Sheet's URL
+        service_account_path (str): Path to the Google service account credentials file
+
+        Returns:
+        gspread.Spreadsheet: The cached spreadsheet handle
+        """
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(sheet_key)
+            if spreadsheet is None:
+                client = self.get_client(service_account_path)
+                with sheets_call('open_by_key'):
+                    spreadsheet = client.open_by_key(sheet_key)
+                self._spreadsheets[sheet_key] = spreadsheet
+                self._service_accounts[sheet_key] = service_account_path
+            return spreadsheet
+
+    def get_worksheet(self, spreadsheet, title):
+        """
+        Return a cached worksheet handle, avoiding a metadata fetch on every lookup
+
+        Raises gspread.exceptions.WorksheetNotFound if the worksheet does not exist.
+        """
+        cache_key = (spreadsheet.id, title)
+        with self._lock:
+            worksheet = self._worksheets.get(cache_key)
+            if worksheet is None:
+                with sheets_call('worksheet'):
+                    # Every call on the handle is timed and counted for /metrics
+                    worksheet = InstrumentedWorksheet(spreadsheet.worksheet(title))
+                self._worksheets[cache_key] = worksheet
+            return worksheet
+
+    def cache_worksheet(self, spreadsheet, worksheet):
+        """Remember a worksheet created by this process (e.g. via add_worksheet) and return the cached handle"""
+        with self._lock:
+            if not isinstance(worksheet, InstrumentedWorksheet):
+                worksheet = InstrumentedWorksheet(worksheet)
+            self._worksheets[(spreadsheet.id, worksheet.title)] = worksheet
+            return worksheet
+
+    def invalidate(self, sheet_key=None):
+        """
+        Drop cached handles so the next call reconnects
+
+        The client the spreadsheet was opened with is dropped as well, so an
+        authentication or token failure is followed by a fresh login rather
+        than another call on the broken client.
+
+        Parameters:
+        sheet_key (str, optional): Only forget this spreadsheet and its client; forget everything if omitted
+        """
+        with self._lock:
+            if sheet_key is None:
+                self._clients.clear()
+                self._spreadsheets.clear()
+                self._worksheets.clear()
+                self._service_accounts.clear()
+                return
+
+            # Other spreadsheets opened through the same client are dropped with it
+            service_account_path = self._service_accounts.get(sheet_key)
+            sheet_keys = {key for key, path in self._service_accounts.items() if path == service_account_path}
+            sheet_keys.add(sheet_key)
+            self._clients.pop(service_account_path, None)
+            for key in sheet_keys:
+                self._spreadsheets.pop(key, None)
+                self._service_accounts.pop(key, None)
+            for cache_key in [k for k in self._worksheets if k[0] in sheet_keys]:
+                del self._worksheets[cache_key]
+
+    def _mount_pool(self, client):
+        """Give the client's HTTP session a connection pool large enough for concurrent requests"""
+        http_client = getattr(client, 'http_client', client)  # gspread 5 keeps the session on the client
+        session = getattr(http_client, 'session', None)
+        if session is None:
+            return
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+
+# Shared by app.py and the command line tools
+_pool = SheetsClientPool()
+
+def get_spreadsheet(sheet_key, service_account_path):
+    """Return the process-wide spreadsheet handle (see SheetsClientPool.get_spreadsheet)"""
+    return _pool.get_spreadsheet(sheet_key, service_account_path)
+
+def get_worksheet(spreadsheet, title):
+    """Return a cached worksheet handle (see SheetsClientPool.get_worksheet)"""
+    return _pool.get_worksheet(spreadsheet, title)
+
+def cache_worksheet(spreadsheet, worksheet):
+    """Remember a newly created worksheet in the process-wide pool and return the cached handle"""
+    return _pool.cache_worksheet(spreadsheet, worksheet)
+
+def invalidate(sheet_key=None):
+    """Forget cached handles so the next call reconnects"""
+    _pool.invalidate(sheet_key)
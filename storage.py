@@ -0,0 +1,704 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import zip_longest
+import numpy as np
+import pandas as pd
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import rowcol_to_a1
+import sheets_client
+from config import SHEETS_MIRROR
+from metrics import sheets_call
+from log_snapshot import LogSnapshot
+from aggregates import CUBE_DIMENSIONS, date_range_slice
+from duplicate_index import fingerprints
+
+# Which storage engine serves the app: 'sheets' (the Google Sheet) or 'sqlite' (a local database)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sheets')
+
+# Database file of the SQLite engine
+SQLITE_STORAGE_PATH = os.environ.get(
+    'SQLITE_STORAGE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'time_tracker.sqlite3'))
+
+# Column layout of the LOG sheet, shared by the writers and the snapshot
+LOG_HEADERS = ['Date', 'Team Member', 'Category', 'Product Family', 'Project', 'Hours', 'Comments']
+LOG_HEADER_RANGE = 'A1:G1'
+
+# Worksheet holding the team member, category, product family and project lists
+BACKEND_WORKSHEET = "BACKEND DATA FOR APP.PY"
+
+# Limits for a single batch_update request when writing projects back to LOG
+MAX_RANGES_PER_REQUEST = 500
+MAX_CELLS_PER_REQUEST = 10000
+MAX_WRITE_RETRIES = 5
+
+# Serializes read-then-write updates of the BACKEND project column within this process
+_backend_write_lock = threading.Lock()
+
+# Transient Sheets API statuses worth retrying a write on: rate limited or a backend/gateway failure
+RETRY_WRITE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def find_column(headers, name):
+    """
+    Locate a column by name, ignoring case and surrounding whitespace
+
+    Parameters:
+    headers (list): Header row values
+    name (str): Column to look for, e.g. 'Project'
+
+    Returns:
+    int or None: 0-based position of the first matching header, None if there is none
+    """
+    wanted = name.strip().lower()
+    for i, header in enumerate(headers):
+        if str(header).strip().lower() == wanted:
+            return i
+    return None
+
+class SheetsStorage:
+    """
+    Reference lists and time entries kept in the Google Sheet
+
+    Reference lists are columns A-D of the BACKEND DATA worksheet and entries
+    are rows of LOG. Reads go through a LogSnapshot, so queries are answered
+    from a local copy that is topped up incrementally.
+    """
+
+    name = 'sheets'
+
+    def __init__(self, sheet_key, service_account_file, snapshot_path=None):
+        """
+        Parameters:
+        sheet_key (str): Key of the spreadsheet
+        service_account_file (str): Path to the service account key
+        snapshot_path (str, optional): Where to persist the LOG snapshot
+        """
+        self.sheet_key = sheet_key
+        self.service_account_file = service_account_file
+        self.snapshot = LogSnapshot(LOG_HEADERS, snapshot_path=snapshot_path, sheet_key=sheet_key)
+
+        # IDs of LOG worksheets whose header row has already been verified by this process
+        self._verified_log_headers = set()
+        self._log_headers_lock = threading.Lock()
+
+    def connect(self):
+        """Return the shared, long-lived spreadsheet handle, or None if the sheet cannot be reached"""
+        try:
+            # The client and spreadsheet handle are created once and reused by every request
+            return sheets_client.get_spreadsheet(self.sheet_key, self.service_account_file)
+        except Exception as e:
+            print(f"Error connecting to Google Sheet: {e}")
+            self.reset()
+            return None
+
+    def reset(self):
+        """Forget the cached connection so the next call reconnects"""
+        sheets_client.invalidate(self.sheet_key)
+
+    def reference_columns(self):
+        """
+        Read the team member, category, product family and project columns in one batched range read
+
+        Returns:
+        list: Four lists of raw cell values, header excluded
+        """
+        sh = self.connect()
+        if not sh:
+            raise ConnectionError("Could not connect to Google Sheets")
+
+        worksheet = sheets_client.get_worksheet(sh, BACKEND_WORKSHEET)
+        columns = list(worksheet.get('A2:D', major_dimension='COLUMNS'))  # Skip header
+        columns += [[] for _ in range(4 - len(columns))]  # Trailing empty columns are omitted
+        return columns[:4]
+
+    def add_projects(self, new_projects, worksheet=None):
+        """
+        Add several new projects to the backend data with one read and one write
+
+        Parameters:
+        new_projects (list): The new project names to add
+        worksheet (gspread.Worksheet, optional): The BACKEND DATA worksheet
+
+        Returns:
+        bool: True if successful, False otherwise
+        """
+        new_projects = [p for p in dict.fromkeys(new_projects) if p and p.strip()]
+        if not new_projects:
+            return True
+
+        # If no worksheet is provided, get a connection
+        if worksheet is None:
+            sh = self.connect()
+            if not sh:
+                return False
+
+            try:
+                worksheet = sheets_client.get_worksheet(sh, BACKEND_WORKSHEET)
+            except Exception as e:
+                print(f"Error accessing worksheet: {e}")
+                self.reset()
+                return False
+
+        # Concurrent requests would otherwise compute the same next_row and overwrite each other
+        with _backend_write_lock:
+            try:
+                # Get all projects from column 4
+                all_projects = worksheet.col_values(4)[1:]  # Skip header
+
+                # Skip projects that already exist (exact match)
+                existing = set(all_projects)
+                for project in new_projects:
+                    if project in existing:
+                        print(f"Project already exists: {project}")
+                new_projects = [p for p in new_projects if p not in existing]
+                if not new_projects:
+                    return True  # Already exist, no need to add
+
+                # Find the first empty cell in column 4 (project column)
+                next_row = len(all_projects) + 2  # +2 because: +1 for header, +1 for 1-indexed
+                last_row = next_row + len(new_projects) - 1
+
+                # Write all new projects below the existing ones in one call
+                worksheet.update(values=[[project] for project in new_projects],
+                                 range_name=f'D{next_row}:D{last_row}')
+
+                for project in new_projects:
+                    print(f"Added new project: {project}")
+                return True
+            except Exception as e:
+                print(f"Error adding project to backend: {e}")
+                return False
+
+    def log_worksheet(self, sh=None):
+        """Return the LOG worksheet, creating it and its header row if needed"""
+        sh = sh or self.connect()
+        if not sh:
+            raise ConnectionError("Could not connect to Google Sheets")
+
+        # Select the 'LOG' sheet or create it if it does not exist
+        try:
+            log_worksheet = sheets_client.get_worksheet(sh, 'LOG')
+        except WorksheetNotFound:
+            with sheets_call('add_worksheet'):
+                log_worksheet = sh.add_worksheet(title='LOG', rows="100", cols="20")
+            log_worksheet = sheets_client.cache_worksheet(sh, log_worksheet)
+
+        # Make sure the header row is in place (checked once per process)
+        self.ensure_log_headers(log_worksheet)
+        return log_worksheet
+
+    def ensure_log_headers(self, log_worksheet):
+        """
+        Write the LOG header row if it is missing, reading only the first row and only once per process
+
+        Parameters:
+        log_worksheet (gspread.Worksheet): The LOG worksheet
+        """
+        with self._log_headers_lock:
+            if log_worksheet.id in self._verified_log_headers:
+                return
+
+            first_row = log_worksheet.get(LOG_HEADER_RANGE)
+            first_row = first_row[0] if first_row else []
+
+            # Check if first row is empty or doesn't match our headers
+            if not first_row or set(LOG_HEADERS) != set(first_row):
+                log_worksheet.update(values=[LOG_HEADERS], range_name=LOG_HEADER_RANGE)
+                print("Added headers to LOG sheet")
+
+            self._verified_log_headers.add(log_worksheet.id)
+
+    def append_rows(self, rows, log_worksheet=None):
+        """
+        Append several rows to the LOG sheet in a single API call
+
+        Parameters:
+        rows (list): List of row value lists, in LOG_HEADERS order
+        log_worksheet (gspread.Worksheet, optional): The LOG worksheet
+        """
+        if not rows:
+            return
+
+        log_worksheet = log_worksheet or self.log_worksheet()
+        start = time.perf_counter()
+        log_worksheet.append_rows(rows)
+        self.snapshot.record_appended(rows)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Appended {len(rows)} rows to LOG in {elapsed_ms:.0f} ms (1 API call)")
+
+    def record_queued(self, rows):
+        """Let duplicate checks see rows that are queued for LOG but not written yet"""
+        self.snapshot.record_appended(rows, written=False)
+
+    def refresh(self):
+        """Top up the local LOG snapshot with rows added since the last call"""
+        sh = self.connect()
+        if not sh:
+            return
+
+        try:
+            self.snapshot.refresh(sheets_client.get_worksheet(sh, 'LOG'))
+        except Exception as e:
+            # Keep serving the last known data rather than nothing
+            print(f"Error retrieving log data: {e}")
+            self.reset()
+
+    @property
+    def version(self):
+        """Identifier of the current LOG data, usable as a cache key or ETag component"""
+        return self.snapshot.version
+
+    def has_entries(self):
+        return not self.snapshot.current()[0].empty
+
+    def daily_buckets(self, start_date=None, end_date=None, filters=None):
+        """
+        Return hours and entry counts per day and dimension inside a date range
+
+        Parameters:
+        start_date (datetime, optional): First day to include
+        end_date (datetime, optional): Last day to include
+        filters (dict, optional): Dimension column -> list of accepted values (see FILTER_DIMENSIONS)
+
+        Returns:
+        pandas.DataFrame: Columns of CUBE_DIMENSIONS plus Hours and Entries
+        """
+        _, cube, _ = self.snapshot.current()
+        return cube.query(start_date, end_date, filters)
+
+    def recent_entries(self, start_date=None, end_date=None, limit=10, filters=None):
+        """
+        Return the most recent matching LOG entries, newest first, as record dicts
+
+        Only the tail of the date range that can hold them is read: the filtered
+        day buckets tell how many days back the newest `limit` entries start,
+        and the date-sorted snapshot is sliced there with binary search.
+        """
+        df, cube, _ = self.snapshot.current()
+        dates = df['Date'].to_numpy()
+        first, stop = date_range_slice(dates, start_date, end_date)
+
+        buckets = cube.query(start_date, end_date, filters)
+        dated = buckets[buckets['Date'].notna()]
+        if dated['Entries'].sum() >= limit:
+            # Walk back from the newest day until enough entries are covered
+            covered = dated['Entries'].to_numpy()[::-1].cumsum()
+            cutoff = dated['Date'].iloc[len(dated) - 1 - int(np.searchsorted(covered, limit))]
+            cutoff_first, dated_stop = date_range_slice(dates, cutoff, end_date)
+            first, stop = max(first, cutoff_first), min(stop, dated_stop)
+
+        rows = df.iloc[first:stop]
+        for column, values in (filters or {}).items():
+            rows = rows[rows[column].isin(values)]
+        # Same order as nlargest(): newest first, sheet order within a day, undated last
+        return rows.sort_values('Date', ascending=False, kind='stable', na_position='last').head(limit).to_dict('records')
+
+    def find_duplicates(self, rows):
+        """Return True for every row (in LOG_HEADERS order) that is already in LOG"""
+        return self.snapshot.find_duplicates(rows)
+
+    def read_log(self):
+        """
+        Download the whole LOG sheet as text
+
+        Returns:
+        pandas.DataFrame: One row per entry, indexed by sheet row number
+        """
+        sh = self.connect()
+        if not sh:
+            raise ConnectionError("Could not connect to Google Sheets")
+
+        data = sheets_client.get_worksheet(sh, 'LOG').get_all_values()
+        if not data:
+            return pd.DataFrame(columns=LOG_HEADERS)
+        # Data starts on sheet row 2, below the header row
+        return pd.DataFrame(data[1:], columns=data[0], index=range(2, len(data) + 1))
+
+    def update_projects(self, updates):
+        """
+        Write projects into existing LOG rows with as few batch_update calls as possible
+
+        Parameters:
+        updates (dict): Sheet row number -> project name
+
+        Returns:
+        int: Number of rows updated
+        """
+        log_worksheet = self.log_worksheet()
+        # Same lookup as the matcher, so a header like ' project ' is found here too
+        col = find_column(log_worksheet.row_values(1), 'Project')
+        if col is None:
+            raise ValueError("Project column not found in LOG")
+        col += 1  # +1 because gspread uses 1-indexing for columns
+
+        ranges = build_update_ranges(updates, col)
+        print(f"Applying {len(updates)} updates as {len(ranges)} ranges...")
+
+        total_updated = 0
+        api_calls = 0
+        for chunk in chunk_ranges(ranges):
+            batch_update_with_retry(log_worksheet, chunk)
+            api_calls += 1
+            total_updated += sum(len(value_range['values']) for value_range in chunk)
+            print(f"  Progress: {total_updated}/{len(updates)} entries updated")
+
+        print(f"Successfully updated {total_updated} entries in {api_calls} API calls")
+        self.snapshot.invalidate()
+        return total_updated
+
+def build_update_ranges(updates, col):
+    """
+    Coalesce single-cell updates of one column into value ranges, merging contiguous rows
+
+    Parameters:
+    updates (dict): Sheet row number -> new value
+    col (int): 1-based column number
+
+    Returns:
+    list: batch_update payload entries of the form {'range': 'E5:E7', 'values': [[...], ...]}
+    """
+    ranges = []
+    start_row = previous_row = None
+    values = []
+
+    for row, value in sorted((int(row), value) for row, value in updates.items()):
+        if previous_row is not None and row == previous_row + 1:
+            values.append([value])
+        else:
+            if values:
+                ranges.append(_value_range(start_row, previous_row, col, values))
+            start_row, values = row, [[value]]
+        previous_row = row
+
+    if values:
+        ranges.append(_value_range(start_row, previous_row, col, values))
+    return ranges
+
+def _value_range(first_row, last_row, col, values):
+    return {
+        'range': f"{rowcol_to_a1(first_row, col)}:{rowcol_to_a1(last_row, col)}",
+        'values': values
+    }
+
+def chunk_ranges(ranges):
+    """Split value ranges into chunks that stay well inside a single request's limits"""
+    chunk = []
+    chunk_cells = 0
+    for value_range in ranges:
+        cells = len(value_range['values'])
+        if chunk and (len(chunk) >= MAX_RANGES_PER_REQUEST or
+                      chunk_cells + cells > MAX_CELLS_PER_REQUEST):
+            yield chunk
+            chunk, chunk_cells = [], 0
+        chunk.append(value_range)
+        chunk_cells += cells
+    if chunk:
+        yield chunk
+
+def batch_update_with_retry(worksheet, ranges):
+    """Send one batch_update, backing off and retrying when the write quota is exhausted"""
+    for attempt in range(MAX_WRITE_RETRIES + 1):
+        try:
+            return worksheet.batch_update(ranges)
+        except APIError as e:
+            status = getattr(e, 'code', None) or e.response.status_code
+            if status not in RETRY_WRITE_STATUS_CODES or attempt == MAX_WRITE_RETRIES:
+                raise
+            delay = 2 ** attempt
+            print(f"  Sheets API returned {status}, retrying in {delay}s...")
+            time.sleep(delay)
+
+# SELECT list giving the entries table the LOG column names
+_ENTRY_COLUMNS = '''
+    date AS "Date", team_member AS "Team Member", category AS "Category",
+    product_family AS "Product Family", project AS "Project", hours AS "Hours", comments AS "Comments"
+'''
+
+# Matches entries whose date was parsed; the others keep the raw text from the sheet
+_ISO_DATE = "date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+
+# Columns of the entries table the filter dimensions are stored in
+_FILTER_COLUMNS = {
+    'Team Member': 'team_member',
+    'Category': 'category',
+    'Product Family': 'product_family',
+    'Project': 'project'
+}
+
+class SQLiteStorage:
+    """
+    Reference lists and time entries kept in a local SQLite database
+
+    Entries are indexed by date, team member and project, so analytics
+    queries aggregate in SQL over just the matching rows instead of
+    downloading the sheet. Populate it from the sheet with
+    `python storage.py import`.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=SQLITE_STORAGE_PATH, mirrored=SHEETS_MIRROR):
+        """
+        Parameters:
+        path (str): Database file, created if missing
+        mirrored (bool): Whether the app copies writes to the Google Sheet (SHEETS_MIRROR)
+        """
+        self.path = path
+        self.mirrored = mirrored
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript('''
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS backend (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    team_member TEXT,
+                    category TEXT,
+                    product_family TEXT,
+                    project TEXT
+                );
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date TEXT,
+                    team_member TEXT,
+                    category TEXT,
+                    product_family TEXT,
+                    project TEXT,
+                    hours REAL,
+                    comments TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_date ON entries (date);
+                CREATE INDEX IF NOT EXISTS idx_entries_team_member ON entries (team_member, date);
+                CREATE INDEX IF NOT EXISTS idx_entries_project ON entries (project);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+                INSERT OR IGNORE INTO meta VALUES ('version', 0);
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the storage safe to use from any thread
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _bump_version(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def reference_columns(self):
+        """Return the team member, category, product family and project columns as four lists"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT team_member, category, product_family, project FROM backend ORDER BY id'
+            ).fetchall()
+        return [[value for value in column if value is not None] for column in zip(*rows)] or [[], [], [], []]
+
+    def add_projects(self, new_projects, worksheet=None):
+        """Add projects that are not in the backend table yet; returns True"""
+        new_projects = [p for p in dict.fromkeys(new_projects) if p and p.strip()]
+        if not new_projects:
+            return True
+
+        with self._connect() as conn:
+            placeholders = ','.join('?' * len(new_projects))
+            existing = {row[0] for row in conn.execute(
+                f'SELECT project FROM backend WHERE project IN ({placeholders})', new_projects)}
+            added = [p for p in new_projects if p not in existing]
+            conn.executemany('INSERT INTO backend (project) VALUES (?)', [(p,) for p in added])
+            if added:
+                self._bump_version(conn)
+
+        for project in added:
+            print(f"Added new project: {project}")
+        return True
+
+    def append_rows(self, rows):
+        """
+        Insert LOG rows (in LOG_HEADERS order) in one transaction
+
+        Parameters:
+        rows (list): List of row value lists
+        """
+        if not rows:
+            return
+
+        frame = pd.DataFrame(rows, columns=LOG_HEADERS)
+        dates = pd.to_datetime(frame['Date'], errors='coerce')
+        frame['Date'] = dates.dt.strftime('%Y-%m-%d').where(dates.notna(), frame['Date'])
+        frame['Hours'] = pd.to_numeric(frame['Hours'], errors='coerce')
+        values = [tuple(None if pd.isna(v) else v for v in row) for row in frame.itertuples(index=False)]
+
+        start = time.perf_counter()
+        with self._connect() as conn:
+            conn.executemany('''
+                INSERT INTO entries (date, team_member, category, product_family, project, hours, comments)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', values)
+            self._bump_version(conn)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Inserted {len(rows)} rows into {self.path} in {elapsed_ms:.0f} ms")
+
+    def record_queued(self, rows):
+        """Rows are inserted synchronously, so there is never anything queued to remember"""
+
+    def refresh(self):
+        """The database is always current"""
+
+    @property
+    def version(self):
+        """Identifier of the current data, usable as a cache key or ETag component"""
+        with self._connect() as conn:
+            value = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        return f"sqlite-{value}"
+
+    def has_entries(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT 1 FROM entries LIMIT 1').fetchone() is not None
+
+    def _where(self, start_date, end_date, filters=None):
+        clauses, params = [], []
+        if start_date is not None or end_date is not None:
+            # Undated entries keep their raw text, which must not sort into a range
+            clauses.append(_ISO_DATE)
+        if start_date is not None:
+            clauses.append('date >= ?')
+            params.append(start_date.strftime('%Y-%m-%d'))
+        if end_date is not None:
+            clauses.append('date <= ?')
+            params.append(end_date.strftime('%Y-%m-%d'))
+        for column, values in (filters or {}).items():
+            clauses.append(f"{_FILTER_COLUMNS[column]} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def daily_buckets(self, start_date=None, end_date=None, filters=None):
+        """Same as SheetsStorage.daily_buckets(), aggregated by SQLite using the date and team member indexes"""
+        where, params = self._where(start_date, end_date, filters)
+        with self._connect() as conn:
+            buckets = pd.read_sql_query(f'''
+                SELECT date AS "Date", team_member AS "Team Member", category AS "Category",
+                       product_family AS "Product Family", project AS "Project",
+                       SUM(hours) AS "Hours", COUNT(*) AS "Entries"
+                FROM entries{where}
+                GROUP BY date, team_member, category, product_family, project
+            ''', conn, params=params)
+        buckets['Date'] = pd.to_datetime(buckets['Date'], errors='coerce')
+        return buckets[CUBE_DIMENSIONS + ['Hours', 'Entries']]
+
+    def recent_entries(self, start_date=None, end_date=None, limit=10, filters=None):
+        """Same as SheetsStorage.recent_entries(), read with the date and team member indexes"""
+        where, params = self._where(start_date, end_date, filters)
+        dated = f"{where} AND {_ISO_DATE}" if where else f" WHERE {_ISO_DATE}"
+        with self._connect() as conn:
+            df = pd.read_sql_query(f'SELECT {_ENTRY_COLUMNS} FROM entries{dated} ORDER BY date DESC, id LIMIT ?',
+                                   conn, params=params + [limit])
+            # Undated entries come last, as with the Sheets engine; raw text would sort above any ISO date
+            if len(df) < limit and start_date is None and end_date is None:
+                undated = f"{where} AND NOT {_ISO_DATE}" if where else f" WHERE NOT {_ISO_DATE}"
+                df = pd.concat([df, pd.read_sql_query(
+                    f'SELECT {_ENTRY_COLUMNS} FROM entries{undated} ORDER BY id LIMIT ?',
+                    conn, params=params + [limit - len(df)])], ignore_index=True)
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce')
+        return df.to_dict('records')
+
+    def find_duplicates(self, rows):
+        """Return True for every row (in LOG_HEADERS order) that is already stored"""
+        if not rows:
+            return []
+
+        candidates = fingerprints(pd.DataFrame(rows, columns=LOG_HEADERS))
+        # Fingerprints start with (date, team member); fetch just those days through the index
+        keys = {fingerprint[:2] for fingerprint in candidates}
+        with self._connect() as conn:
+            existing = pd.concat([
+                pd.read_sql_query(f'SELECT {_ENTRY_COLUMNS} FROM entries WHERE date = ? AND team_member = ?',
+                                  conn, params=list(key))
+                for key in keys
+            ], ignore_index=True)
+        existing = set(fingerprints(existing))
+        return [fingerprint in existing for fingerprint in candidates]
+
+    def read_log(self):
+        """Return every entry as text, indexed by entry id"""
+        with self._connect() as conn:
+            df = pd.read_sql_query(f'SELECT id, {_ENTRY_COLUMNS} FROM entries ORDER BY id', conn, index_col='id')
+        df['Hours'] = df['Hours'].map(lambda h: '' if pd.isna(h) else f"{h:g}")
+        return df.fillna('')
+
+    def update_projects(self, updates):
+        """
+        Set the project of existing entries
+
+        Refused while the sheet mirror is on: entry ids are not sheet row
+        numbers, so the change could not be copied to the sheet and the two
+        would quietly diverge.
+
+        Parameters:
+        updates (dict): Entry id -> project name
+
+        Returns:
+        int: Number of entries updated
+        """
+        if self.mirrored:
+            raise RuntimeError("Project updates are not mirrored to the Google Sheet; run the matcher with "
+                               "STORAGE_BACKEND=sheets and re-import, or set SHEETS_MIRROR=0")
+
+        with self._connect() as conn:
+            conn.executemany('UPDATE entries SET project = ? WHERE id = ?',
+                             [(project, int(entry_id)) for entry_id, project in updates.items()])
+            self._bump_version(conn)
+        print(f"Successfully updated {len(updates)} entries")
+        return len(updates)
+
+    def import_from(self, source):
+        """
+        Replace the database contents with a copy of another storage's data
+
+        Parameters:
+        source (SheetsStorage): Where to copy the reference lists and entries from
+        """
+        backend_rows = list(zip_longest(*source.reference_columns(), fillvalue=None))
+        log = source.read_log().reindex(columns=LOG_HEADERS).fillna('')
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM backend')
+            conn.execute('DELETE FROM entries')
+            conn.executemany(
+                'INSERT INTO backend (team_member, category, product_family, project) VALUES (?, ?, ?, ?)',
+                [tuple(value or None for value in row) for row in backend_rows]
+            )
+        self.append_rows(log.values.tolist())
+        print(f"Imported {len(backend_rows)} backend rows and {len(log)} LOG entries into {self.path}")
+
+def create_storage(sheet_key, service_account_file, snapshot_path=None, backend=STORAGE_BACKEND):
+    """
+    Build the storage engine selected by STORAGE_BACKEND
+
+    Parameters:
+    sheet_key (str): Key of the spreadsheet
+    service_account_file (str): Path to the service account key
+    snapshot_path (str, optional): Where the Sheets engine persists its LOG snapshot
+    backend (str): 'sheets' or 'sqlite'
+
+    Returns:
+    SheetsStorage or SQLiteStorage: The storage engine
+    """
+    if backend == 'sqlite':
+        return SQLiteStorage(SQLITE_STORAGE_PATH)
+    if backend != 'sheets':
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}', expected 'sheets' or 'sqlite'")
+    return SheetsStorage(sheet_key, service_account_file, snapshot_path=snapshot_path)
+
+if __name__ == '__main__':
+    import sys
+
+    # python storage.py import -- copy the Google Sheet into the SQLite database
+    if sys.argv[1:] != ['import']:
+        print("Usage: python storage.py import")
+        sys.exit(1)
+
+    from config import GOOGLE_SHEET_KEY, SERVICE_ACCOUNT_FILE
+    SQLiteStorage(SQLITE_STORAGE_PATH).import_from(SheetsStorage(GOOGLE_SHEET_KEY, SERVICE_ACCOUNT_FILE))
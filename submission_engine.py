@@ -0,0 +1,199 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Status codes worth retrying: rate limited or a proxy/gateway failure. A 500 is not retried, since the
+# bulk POST may have appended some rows before failing and sending it again would duplicate them
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how many requests are started per second"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Parameters:
+        rate (float): Tokens added per second; 0 or None disables limiting
+        capacity (float, optional): Maximum burst size, defaults to one second's worth of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        if not self.rate:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def create_session(pool_size=8, max_retries=5, backoff_factor=0.5):
+    """
+    Create a requests.Session with a keep-alive pool and retry/backoff on 429, 502, 503 and 504 responses
+
+    Parameters:
+    pool_size (int): Maximum number of pooled connections per host
+    max_retries (int): Retries per request before giving up
+    backoff_factor (float): Base of the exponential backoff between retries, in seconds
+
+    Returns:
+    requests.Session: The configured session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'POST']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Number of (date, team member) groups sent in one /api/entries/bulk request
+BULK_BATCH_SIZE = 200
+
+def to_bulk_entry(date, team_member, total_hours, tasks):
+    """
+    Build one /api/entries/bulk entry from a (date, team member) group
+
+    Parameters:
+    date (str): Date in YYYY-MM-DD format
+    team_member (str): Team member name
+    total_hours (float): Total hours
+    tasks (list): Task dictionaries with category, product_family, project, hours and comment
+
+    Returns:
+    dict: The JSON-ready entry
+    """
+    return {
+        'date': date,
+        'team_member': team_member,
+        'hours': float(total_hours),
+        'tasks': [
+            {
+                'category': task['category'],
+                'product_family': task.get('product_family', ''),
+                'project': task.get('project', ''),
+                'hours': float(task['hours']),
+                'comment': task.get('comment', '')
+            }
+            for task in tasks
+        ]
+    }
+
+def post_bulk_entries(session, app_url, entries):
+    """
+    Send entries to the app's /api/entries/bulk endpoint in one request
+
+    Parameters:
+    session (requests.Session): Session to send the request with
+    app_url (str): Base URL of the time tracker app
+    entries (list): Entries built with to_bulk_entry()
+
+    Returns:
+    tuple: (True if every entry was accepted, list of error dicts from the server,
+            indexes of the entries the app wrote)
+    """
+    response = session.post(f"{app_url}/api/entries/bulk", json={'entries': entries})
+    try:
+        result = response.json()
+    except ValueError:
+        return False, [{'entry': None, 'message': f"Status code {response.status_code}"}], []
+
+    errors = result.get('errors') or []
+    if not errors and not result.get('success'):
+        errors = [{'entry': None, 'message': result.get('message', f"Status code {response.status_code}")}]
+    return not errors, errors, result.get('written_entries') or []
+
+def written_entries(entries, written):
+    """
+    Return the entries of a bulk request that the app wrote
+
+    Entries that were rejected, or whose rows were all skipped as already in
+    LOG, are left out, so they are never recorded as committed by this run.
+
+    Parameters:
+    entries (list): Entries sent with post_bulk_entries()
+    written (list): Entry indexes returned by post_bulk_entries()
+
+    Returns:
+    list: Entries that made it into LOG
+    """
+    return [entries[i] for i in written if isinstance(i, int) and 0 <= i < len(entries)]
+
+def chunked(items, size=BULK_BATCH_SIZE):
+    """Split a list into consecutive chunks of at most size items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class SubmissionEngine:
+    """Runs submissions on a bounded worker pool, rate limited by a token bucket"""
+
+    def __init__(self, max_workers=4, rate_limit=5.0):
+        """
+        Parameters:
+        max_workers (int): Number of submissions in flight at once
+        rate_limit (float): Maximum submissions started per second (0 for unlimited)
+        """
+        self.max_workers = max(1, max_workers)
+        self.bucket = TokenBucket(rate_limit)
+
+    def run(self, jobs, submit, describe=str, count=lambda job: 1):
+        """
+        Submit every job and report throughput
+
+        Parameters:
+        jobs (list): Items to submit
+        submit (callable): Called with one job, returns True on success
+        describe (callable): Returns a short label for a job, used in progress output
+        count (callable): Returns the number of entries a job carries
+
+        Returns:
+        tuple: (list of succeeded jobs, list of failed jobs)
+        """
+        succeeded, failed = [], []
+        entries = 0
+        start = time.perf_counter()
+
+        def limited_submit(job):
+            self.bucket.acquire()
+            try:
+                return submit(job)
+            except Exception as e:
+                print(f"Error submitting {describe(job)}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(limited_submit, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                if future.result():
+                    succeeded.append(job)
+                    entries += count(job)
+                    print(f"✓ Successfully submitted {describe(job)}")
+                else:
+                    failed.append(job)
+                    print(f"✗ Failed to submit {describe(job)}")
+
+        elapsed = time.perf_counter() - start
+        rate = entries / elapsed if elapsed > 0 else 0.0
+        print(f"Submitted {entries} entries in {len(succeeded)} requests in {elapsed:.1f}s "
+              f"({rate:.1f} entries/second, {len(failed)} failed)")
+        return succeeded, failed
@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app reads its settings at import time; keep its files out of the checkout and its worker idle
+_data_dir = tempfile.mkdtemp(prefix='timetracker-tests-')
+os.environ['STORAGE_BACKEND'] = 'sheets'
+os.environ['WRITE_BEHIND'] = '1'
+os.environ['LOG_SNAPSHOT_PATH'] = os.path.join(_data_dir, 'log_snapshot.pkl')
+os.environ['WRITE_QUEUE_PATH'] = os.path.join(_data_dir, 'write_queue.sqlite3')
+os.environ['SQLITE_STORAGE_PATH'] = os.path.join(_data_dir, 'time_tracker.sqlite3')
+os.environ['WRITE_QUEUE_FLUSH_INTERVAL'] = '86400'
+
+@pytest.fixture
+def spreadsheet():
+    """A small fake Google Sheet served in place of the real one"""
+    from fake_gsheets import build_spreadsheet, install
+
+    sheet = build_spreadsheet(log_rows=200)
+    restore = install(sheet)
+    yield sheet
+    restore()
+
+@pytest.fixture
+def app_module(spreadsheet, tmp_path):
+    """The app bound to the fake sheet, with fresh storage, caches and write queue"""
+    import app
+    from storage import SheetsStorage
+    from write_queue import WriteQueue
+
+    storage = SheetsStorage(app.GOOGLE_SHEET_KEY, app.SERVICE_ACCOUNT_FILE)
+    app._storage = app._sheets = storage
+    app._write_queue = WriteQueue(str(tmp_path / 'write_queue.sqlite3'), app.flush_queued_writes,
+                                  flush_interval=86400)
+    app.invalidate_reference_data()
+    app._time_data_cache.clear()
+
+    # Load the snapshot up front; the submit path only tops it up in the background
+    storage.refresh()
+    return app
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,93 @@
+import time
+from submission_engine import written_entries
+
+def log_rows(spreadsheet):
+    return spreadsheet.worksheet('LOG').rows
+
+def bulk_entry(row, comment=None):
+    return {
+        'date': row[0],
+        'team_member': row[1],
+        'tasks': [{'category': row[2], 'product_family': row[3], 'project': row[4], 'hours': row[5],
+                   'comment': row[6] if comment is None else comment}]
+    }
+
+def test_reference_data_etag(client):
+    response = client.get('/api/reference-data')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    cached = client.get('/api/reference-data', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+def test_time_data_etag_changes_with_the_data(client, app_module, spreadsheet):
+    query = {'start_date': '2000-01-01', 'end_date': '2100-01-01'}
+    response = client.get('/api/time-data', query_string=query)
+    assert response.status_code == 200
+    assert response.get_json()['success']
+    etag = response.headers['ETag']
+
+    assert client.get('/api/time-data', query_string=query, headers={'If-None-Match': etag}).status_code == 304
+
+    # A row added to the sheet by someone else shows up on the next refresh, with a new ETag
+    row = list(log_rows(spreadsheet)[-1])
+    row[6] = 'Added elsewhere'
+    log_rows(spreadsheet).append(row)
+    app_module._storage.snapshot.mark_stale()
+
+    changed = client.get('/api/time-data', query_string=query, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+def test_bulk_reports_written_and_skipped_duplicate_entries(client, app_module, spreadsheet):
+    existing = log_rows(spreadsheet)[5]
+    mixed = bulk_entry(existing)
+    mixed['tasks'].append(dict(mixed['tasks'][0], comment='Second task, not in LOG yet'))
+    entries = [
+        bulk_entry(existing),  # Already in LOG
+        bulk_entry(existing, comment='Not in LOG yet'),
+        mixed,  # One task already in LOG, one new
+        {'date': 'not a date'}
+    ]
+
+    result = client.post('/api/entries/bulk', json={'entries': entries}).get_json()
+    assert result['written'] == 2
+    assert result['skipped_duplicates'] == 1
+    assert result['written_entries'] == [1, 2]
+    assert result['rows_written'] == 2
+    assert result['duplicate_rows'] == 2
+    assert [error['entry'] for error in result['errors']] == [3]
+
+    # Only entries that were written are journaled as committed
+    assert written_entries(entries, result['written_entries']) == entries[1:3]
+
+    # Resubmitting before the queue is flushed writes nothing new
+    again = client.post('/api/entries/bulk', json={'entries': entries[:3]}).get_json()
+    assert again['written'] == 0
+    assert again['skipped_duplicates'] == 3
+    assert again['rows_written'] == 0
+
+    rows_before = len(log_rows(spreadsheet))
+    assert app_module._write_queue.drain() == 1
+    assert len(log_rows(spreadsheet)) == rows_before + 2
+
+def test_submit_does_not_download_log(client, app_module, spreadsheet):
+    reference = app_module.get_reference_data()
+    entry = {
+        'date': '2026-03-02',
+        'team_member': reference['team_members'][0],
+        'tasks': [{'category': reference['categories'][0], 'product_family': reference['product_families'][0],
+                   'project': reference['projects'][0], 'hours': 8, 'comment': 'Queued only'}]
+    }
+
+    # Force the next refresh to be a slow full reload; the submit must not be the one waiting for it
+    spreadsheet.latency_by_method['get_all_values'] = 2.0
+    app_module._storage.snapshot.invalidate()
+    started = time.perf_counter()
+    result = client.post('/api/entries/bulk', json={'entries': [entry]}).get_json()
+    assert time.perf_counter() - started < 1.0
+    assert result['written'] == 1
+
+    # A repeated submit is caught from the queued rows alone
+    assert client.post('/api/entries/bulk', json={'entries': [entry]}).get_json()['skipped_duplicates'] == 1
@@ -0,0 +1,35 @@
+import pandas as pd
+from duplicate_index import DuplicateIndex, fingerprints
+from log_snapshot import LogSnapshot
+from storage import LOG_HEADERS
+
+ROW = ['2026-03-02', 'Member 001', 'Category 1', 'Family 1', 'Project 0001 Cap', '8', 'Design review']
+
+def frame(hours):
+    return pd.DataFrame([ROW[:5] + [hours] + ROW[6:]], columns=LOG_HEADERS)
+
+def test_integer_and_float_hours_share_a_fingerprint():
+    integer = frame(8)
+    assert integer['Hours'].dtype.kind == 'i'
+    expected = fingerprints(frame(8.0))
+    assert fingerprints(integer) == expected
+    assert fingerprints(frame('8')) == expected
+    assert fingerprints(frame('8.0')) == expected
+
+def test_fractional_hours_still_differ():
+    assert fingerprints(frame(8)) != fingerprints(frame(8.5))
+
+def test_raw_rows_match_typed_snapshot_rows():
+    snapshot = LogSnapshot(LOG_HEADERS)
+    typed = snapshot._build_frame([ROW], LOG_HEADERS)
+    index = DuplicateIndex()
+    index.add(typed)
+
+    assert index.find([ROW[:5] + [8] + ROW[6:], ROW[:5] + [8.0] + ROW[6:]], LOG_HEADERS) == [True, True]
+    assert index.find([ROW[:6] + ['Something else']], LOG_HEADERS) == [False]
+
+def test_remove_drops_rows():
+    index = DuplicateIndex()
+    index.add_rows([ROW], LOG_HEADERS)
+    index.remove(frame('8'))
+    assert len(index) == 0
@@ -0,0 +1,39 @@
+import threading
+import storage
+from fake_gsheets import build_spreadsheet, install
+
+def test_concurrent_add_projects_do_not_overwrite_each_other():
+    # Slow calls widen the window between reading column D and writing below it
+    sheet = build_spreadsheet(log_rows=10, latency_by_method={'col_values': 0.02, 'update': 0.02})
+    restore = install(sheet)
+    try:
+        sheets = storage.SheetsStorage('fake-sheet', 'unused.json')
+        before = sheets.reference_columns()[3]
+        new_projects = [f"Concurrent Project {i}" for i in range(8)]
+
+        threads = [threading.Thread(target=sheets.add_projects, args=([project],)) for project in new_projects]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        projects = sheets.reference_columns()[3]
+        assert projects[:len(before)] == before
+        assert sorted(projects[len(before):]) == sorted(new_projects)
+    finally:
+        restore()
+
+def test_add_projects_skips_existing_names():
+    sheet = build_spreadsheet(log_rows=10)
+    restore = install(sheet)
+    try:
+        sheets = storage.SheetsStorage('fake-sheet', 'unused.json')
+        before = sheets.reference_columns()[3]
+        assert sheets.add_projects([before[0], 'Brand New Project'])
+        assert sheets.reference_columns()[3] == before + ['Brand New Project']
+    finally:
+        restore()
+
+def test_find_column_ignores_case_and_whitespace():
+    assert storage.find_column(['Date', ' project '], 'Project') == 1
+    assert storage.find_column(['Date'], 'Project') is None
@@ -0,0 +1,57 @@
+import threading
+import time
+from write_queue import WriteQueue
+
+def make_queue(tmp_path, flush, lease_seconds=0.3):
+    return WriteQueue(str(tmp_path / 'queue.sqlite3'), flush, flush_interval=3600, lease_seconds=lease_seconds)
+
+def test_slow_flush_keeps_its_lease(tmp_path):
+    written = []
+
+    def slow_flush(items):
+        time.sleep(1.0)  # Several lease lengths, like append_rows backing off on 429s
+        written.extend(items)
+        return True
+
+    first = make_queue(tmp_path, slow_flush)
+    second = make_queue(tmp_path, slow_flush)
+    first.enqueue('log_rows', [['2026-03-02', 'Member 001']])
+
+    worker = threading.Thread(target=first.drain)
+    worker.start()
+    time.sleep(0.6)
+    assert second.drain() == 0  # Still leased, not redelivered
+    worker.join()
+
+    assert written == [('log_rows', [['2026-03-02', 'Member 001']])]
+    assert first.pending_count() == 0
+
+def test_abandoned_claim_is_redelivered_once_the_lease_expires(tmp_path):
+    written = []
+    crashed = make_queue(tmp_path, lambda items: True, lease_seconds=0.2)
+    survivor = make_queue(tmp_path, lambda items: written.extend(items) or True, lease_seconds=0.2)
+    crashed.enqueue('projects', ['New Project'])
+
+    # Claimed, then never acknowledged or renewed, as if the worker died mid-flush
+    assert len(crashed._claim()) == 1
+    assert survivor.drain() == 0
+
+    time.sleep(0.3)
+    assert survivor.drain() == 1
+    assert written == [('projects', ['New Project'])]
+    assert survivor.pending_count() == 0
+
+def test_failed_flush_is_kept_and_backed_off(tmp_path):
+    queue = make_queue(tmp_path, lambda items: False)
+    queue.enqueue('log_rows', [['row']])
+
+    assert queue.drain() == 0
+    assert queue.pending_count() == 1
+    assert queue.drain() == 0  # Not due again until the backoff has passed
+
+    flushed = []
+    queue.flush = lambda items: flushed.extend(items) or True
+    with queue._connect() as conn:
+        conn.execute('UPDATE pending_writes SET available_at = 0')
+    assert queue.drain() == 1
+    assert flushed == [('log_rows', [['row']])]
@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Seconds the worker waits between drains, so bursts of submissions are written together
+FLUSH_INTERVAL = float(os.environ.get('WRITE_QUEUE_FLUSH_INTERVAL', '2'))
+
+# Most queued items coalesced into one flush
+MAX_BATCH = int(os.environ.get('WRITE_QUEUE_MAX_BATCH', '500'))
+
+# Seconds a claimed batch stays invisible to other workers; renewed while its flush is running,
+# so it only expires (and the batch is retried) if the worker dies without acknowledging it
+LEASE_SECONDS = float(os.environ.get('WRITE_QUEUE_LEASE_SECONDS', '120'))
+
+# Upper bound of the exponential backoff between retries of a failed batch, in seconds
+MAX_BACKOFF = 300
+
+class WriteQueue:
+    """
+    Durable write-behind queue in front of the Google Sheet
+
+    Writes are stored in a local SQLite database (WAL mode) and acknowledged
+    as soon as they are on disk. A background thread drains the queue every
+    FLUSH_INTERVAL seconds and hands everything that is due to a flush
+    callback in one batch, so a burst of submissions turns into a few
+    coalesced Sheets calls. Failed batches are retried with exponential
+    backoff; nothing is dropped.
+
+    Items are claimed with a lease rather than deleted up front, so a crash
+    mid-flush (or a second process sharing the file) never loses them. The
+    lease is renewed for as long as the flush runs, however long the Sheets
+    calls back off, so a slow flush is never claimed and written a second
+    time; only a batch whose worker died after the write but before the
+    acknowledgement is written again.
+    """
+
+    def __init__(self, path, flush, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH, lease_seconds=LEASE_SECONDS):
+        """
+        Parameters:
+        path (str): SQLite file holding the queue
+        flush (callable): Called with a list of (kind, payload) tuples; returns True once they are written
+        flush_interval (float): Seconds between drains
+        max_batch (int): Most items handed to one flush call
+        lease_seconds (float): Seconds a claimed batch is hidden from other workers between renewals
+        """
+        self.path = path
+        self.flush = flush
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.lease_seconds = lease_seconds
+        self.worker_id = uuid.uuid4().hex
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pending_writes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    claimed_by TEXT
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the queue safe to use from any thread
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA synchronous=NORMAL')
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same rows
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, kind, payload):
+        """
+        Durably store one write and make sure the worker is running
+
+        Parameters:
+        kind (str): What the payload is, interpreted by the flush callback
+        payload: JSON-serializable data of the write
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO pending_writes (kind, payload, enqueued_at, available_at) VALUES (?, ?, ?, ?)',
+                (kind, json.dumps(payload), now, now)
+            )
+        self.start()
+
+    def pending_count(self):
+        """Return the number of writes not yet flushed"""
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM pending_writes').fetchone()[0]
+
+    def start(self):
+        """Start the background worker if it is not running yet"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sheets-write-behind', daemon=True)
+                self._thread.start()
+
+    def drain(self):
+        """
+        Flush every write that is due, in batches of at most max_batch
+
+        Returns:
+        int: Number of writes flushed
+        """
+        flushed = 0
+        while True:
+            batch = self._claim()
+            if not batch:
+                return flushed
+
+            ids = [row[0] for row in batch]
+            items = [(kind, json.loads(payload)) for _, kind, payload, _ in batch]
+            flushed_event = threading.Event()
+            renewer = threading.Thread(target=self._renew_lease, args=(ids, flushed_event),
+                                       name='write-queue-lease', daemon=True)
+            renewer.start()
+            try:
+                ok = self.flush(items)
+            except Exception as e:
+                print(f"Error flushing write queue: {e}")
+                ok = False
+            finally:
+                flushed_event.set()
+                renewer.join()
+
+            if not ok:
+                self._release(batch)
+                return flushed
+
+            with self._connect() as conn:
+                conn.executemany('DELETE FROM pending_writes WHERE id = ?', [(i,) for i in ids])
+            flushed += len(ids)
+
+    def _claim(self):
+        now = time.time()
+        with self._connect() as conn:
+            batch = conn.execute(
+                'SELECT id, kind, payload, attempts FROM pending_writes WHERE available_at <= ? ORDER BY id LIMIT ?',
+                (now, self.max_batch)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE pending_writes SET claimed_by = ?, available_at = ? WHERE id = ?',
+                [(self.worker_id, now + self.lease_seconds, row[0]) for row in batch]
+            )
+        return batch
+
+    def _renew_lease(self, ids, flushed_event):
+        # Push the lease out again well before it expires, until the flush returns
+        while not flushed_event.wait(self.lease_seconds / 3):
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        'UPDATE pending_writes SET available_at = ? WHERE id = ? AND claimed_by = ?',
+                        [(time.time() + self.lease_seconds, row_id, self.worker_id) for row_id in ids]
+                    )
+            except Exception as e:
+                print(f"Error renewing write queue lease: {e}")
+
+    def _release(self, batch):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'UPDATE pending_writes SET attempts = ?, available_at = ?, claimed_by = NULL WHERE id = ?',
+                [(attempts + 1, now + min(MAX_BACKOFF, 2 ** attempts), row_id)
+                 for row_id, _, _, attempts in batch]
+            )
+        retry_in = min(MAX_BACKOFF, 2 ** min(row[3] for row in batch))
+        print(f"Write queue flush failed, {len(batch)} writes will be retried in {retry_in} s")
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                flushed = self.drain()
+                if flushed:
+                    print(f"Write queue flushed {flushed} writes")
+            except Exception as e:
+                print(f"Error draining write queue: {e}")